@@ -1,4 +1,11 @@
-import sys
+import argparse
+import heapq
+import mmap
+import os
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from FPGrowth import fp_growth
 """ 
 Reads the contents of a file. We start by creating an empty list for transactions, and then we convert each line into a set of items (the transaction). 
 Each item is separated by a tab which we also implement in our file reading function.
@@ -17,6 +24,80 @@ def file_reader(inputfile):
             transactions.append(set(items))
     return transactions
 
+"""
+EncodedTransactions class that stores the transactions in a CSR-style layout. Every item string is interned into a dense integer code,
+and the sorted codes of all transactions are stored back to back in one flat array('i'). Transaction i is items[offsets[i]:offsets[i + 1]].
+Iterating over it yields every transaction as a set of codes, so it can be used everywhere a list of transactions is expected.
+"""
+class EncodedTransactions:
+    def __init__(self):
+        self.items = array('i')
+        self.offsets = array('q', [0])
+        self.vocabulary = []
+        self.item_codes = {}
+
+    def append(self, items):
+        codes = set()
+        for item in items:
+            code = self.item_codes.get(item)
+            if code is None:
+                code = self.item_codes[item] = len(self.vocabulary)
+                self.vocabulary.append(item)
+            codes.add(code)
+        self.items.extend(sorted(codes))
+        self.offsets.append(len(self.items))
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index):
+        return set(self.items[self.offsets[index]:self.offsets[index + 1]])
+
+    def __iter__(self):
+        items, offsets = self.items, self.offsets
+        for i in range(len(offsets) - 1):
+            yield set(items[offsets[i]:offsets[i + 1]])
+
+    """
+    Function that turns an itemset of codes back into the original item strings
+
+    Parameters:
+    - itemset (frozenset): The itemset of item codes
+
+    Returns:
+    - A frozenset of the item strings
+    """
+    def decode(self, itemset):
+        return frozenset(self.vocabulary[code] for code in itemset)
+
+"""
+Reads the contents of a file like file_reader, but interns the items into integer codes and stores the transactions in an EncodedTransactions.
+The file is read in binary in chunks of lines, optionally through mmap, so the input is never held in memory as Python strings.
+
+Parameters:
+- inputfile (str): filename of the given input file / file containing the transactions
+- chunk_size (int): The approximate number of bytes read per chunk
+- use_mmap (bool): Read the file through a memory map instead of buffered reads
+
+Returns:
+- The EncodedTransactions holding all the transactions and the vocabulary of the items
+"""
+def encoded_file_reader(inputfile, chunk_size=1 << 20, use_mmap=False):
+    transactions = EncodedTransactions()
+    with open(inputfile, 'rb') as file:
+        if use_mmap and os.fstat(file.fileno()).st_size:
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                for line in iter(mapped.readline, b''):
+                    transactions.append(item.decode() for item in line.strip().split(b'\t'))
+        else:
+            while True:
+                lines = file.readlines(chunk_size)
+                if not lines:
+                    break
+                for line in lines:
+                    transactions.append(item.decode() for item in line.strip().split(b'\t'))
+    return transactions
+
 """
 This function is responsible for calculating the support
 
@@ -74,8 +155,10 @@ def gen_subset(itemset):
     return subsets
 
 """
-This function is responsible for generating the candidate itemsets for the next level based on the previous level's frequent itemsets. 
+This function is responsible for generating the candidate itemsets for the next level based on the previous level's frequent itemsets.
 We follow the lecture's procedure to do this using self-joining and pruning.
+The items are encoded as integers and every itemset is kept as a sorted tuple, so after sorting the itemsets the ones sharing
+the same (k-2)-prefix are next to each other. Only those are joined (Apriori-gen), and the pruning looks the (k-1)-subsets up in a set of tuples.
 
 Parameters:
 k (int): The target size of the candidate itemsets
@@ -94,30 +177,26 @@ def generate_candidate_itemsets(k, prev_level_frequent_itemsets, transactions):
             for item in transaction:
                 candidate_itemsets.add(frozenset([item]))
     else:
-        # Step 1: Self-joinin
-        items = set()
-        for itemset in prev_level_frequent_itemsets:
-            for item in itemset:
-                items.add(item)
-        for itemset1 in prev_level_frequent_itemsets:
-            for itemset2 in prev_level_frequent_itemsets:
-                if itemset1 != itemset2:
-                    union_set = itemset1.union(itemset2)
-                    if len(union_set) == k:
-                        candidate_itemsets.add(union_set)
-        
-        # Step 2: Pruning
-        pruned_candidates = candidate_itemsets.copy()
-        for candidate in candidate_itemsets:
-            # Convert the candidate frozenset to a list for processing
-            candidate_list = list(candidate)
-            # Generate all k-1 subsets of candidate
-            subsets = get_combinations(candidate_list, k-1)
-            for subset in subsets:
-                if frozenset(subset) not in prev_level_frequent_itemsets:
-                    pruned_candidates.discard(candidate)
-                    break
-        candidate_itemsets = pruned_candidates
+        # Encode the items as integers and the itemsets as sorted tuples
+        items = sorted({item for itemset in prev_level_frequent_itemsets for item in itemset})
+        item_codes = {item: code for code, item in enumerate(items)}
+        encoded = sorted(tuple(sorted(item_codes[item] for item in itemset)) for itemset in prev_level_frequent_itemsets)
+        encoded_set = set(encoded)
+
+        # Step 1: Self-joining of itemsets with the same (k-2)-prefix
+        start = 0
+        while start < len(encoded):
+            prefix = encoded[start][:-1]
+            end = start + 1
+            while end < len(encoded) and encoded[end][:-1] == prefix:
+                end += 1
+            for i in range(start, end):
+                for j in range(i + 1, end):
+                    candidate = encoded[i] + encoded[j][-1:]
+                    # Step 2: Pruning. The two subsets dropping one of the last two items are the joined itemsets
+                    if all(candidate[:m] + candidate[m + 1:] in encoded_set for m in range(k - 2)):
+                        candidate_itemsets.add(frozenset(items[code] for code in candidate))
+            start = end
     return candidate_itemsets
 
 """
@@ -127,65 +206,450 @@ Parameters:
 - transactions (list[set]): The list of transactions
 - candidates (set[frozenset]): The candidate itemsets
 - min_support (float): The minimum support chosen by the user
+- support_counts (dict): If given, the support count of every frequent itemset is added to it
 
 Returns:
 - The frequent itemset [frozenset] that meets the minimum support threshold
 """
-def frequent_item_set(transactions, candidates, min_support):
+def frequent_item_set(transactions, candidates, min_support, support_counts=None):
     item_counts = {}
     transaction_count = len(transactions)
     min_support_count = min_support * transaction_count / 100 # To two decimals
     
     # Calculate support for each candidate
-    for candidate in candidates:
-        item_counts[candidate] = sum(1 for transaction in transactions if candidate.issubset(transaction))
+    if isinstance(transactions, EncodedTransactions):
+        candidates = list(candidates)
+        item_counts = dict(zip(candidates, count_encoded(transactions.items, transactions.offsets, 0, transaction_count, candidates)))
+    else:
+        for candidate in candidates:
+            item_counts[candidate] = sum(1 for transaction in transactions if candidate.issubset(transaction))
     
     # Filter based on support threshold
     frequent_itemsets = {item for item, count in item_counts.items() if count >= min_support_count}
+    if support_counts is not None:
+        support_counts.update((itemset, item_counts[itemset]) for itemset in frequent_itemsets)
+    return frequent_itemsets
+
+"""
+This function counts the candidates in a range of transactions stored in the flat code arrays of an EncodedTransactions.
+Every transaction is turned into a set once and tested against all the candidates, instead of once per candidate.
+
+Parameters:
+- items: The flat array of item codes
+- offsets: The offsets of the transactions in items
+- start (int): The first transaction to count
+- end (int): The transaction after the last one to count
+- candidates (list[frozenset]): The candidate itemsets of item codes
+
+Returns:
+- A list with the support count of every candidate, in the order of candidates
+"""
+def count_encoded(items, offsets, start, end, candidates):
+    counts = [0] * len(candidates)
+    for tid in range(start, end):
+        transaction = set(items[offsets[tid]:offsets[tid + 1]])
+        for position, candidate in enumerate(candidates):
+            if candidate.issubset(transaction):
+                counts[position] += 1
+    return counts
+
+"""
+This function builds the vertical layout of the transactions. Every item gets one bitmap (a Python int) where bit i is set
+when transaction i contains the item. The bits are collected in a bytearray first so every bitmap is built in linear time.
+
+Parameters:
+- transactions (list[set]): The list of transactions
+
+Returns:
+- A dict mapping every item to its transaction-ID bitmap
+"""
+def build_tid_bitmaps(transactions):
+    num_bytes = (len(transactions) + 7) // 8
+    buffers = {}
+    if isinstance(transactions, EncodedTransactions):
+        # Walk the flat code array directly instead of building a set per transaction
+        items, offsets = transactions.items, transactions.offsets
+        for tid in range(len(transactions)):
+            byte_index, bit = tid >> 3, 1 << (tid & 7)
+            for position in range(offsets[tid], offsets[tid + 1]):
+                buffer = buffers.get(items[position])
+                if buffer is None:
+                    buffer = buffers[items[position]] = bytearray(num_bytes)
+                buffer[byte_index] |= bit
+        return {item: int.from_bytes(buffer, 'little') for item, buffer in buffers.items()}
+    for tid, transaction in enumerate(transactions):
+        byte_index, bit = tid >> 3, 1 << (tid & 7)
+        for item in transaction:
+            buffer = buffers.get(item)
+            if buffer is None:
+                buffer = buffers[item] = bytearray(num_bytes)
+            buffer[byte_index] |= bit
+    return {item: int.from_bytes(buffer, 'little') for item, buffer in buffers.items()}
+
+"""
+This function does the same as frequent_item_set, but counts the support vertically. The support of a candidate is the popcount
+of the intersection (bitwise and) of its items' bitmaps. The bitmaps of the frequent itemsets of the current level are kept in
+prefix_cache, so at the next level a candidate only has to intersect the bitmap of its (k-1)-prefix with the bitmap of its last item.
+
+Parameters:
+- transactions (list[set]): The list of transactions
+- candidates (set[frozenset]): The candidate itemsets
+- min_support (float): The minimum support chosen by the user
+- tid_bitmaps (dict): The item bitmaps from build_tid_bitmaps. Built from the transactions if not given
+- prefix_cache (dict): Bitmaps of the previous level's frequent itemsets keyed by their sorted tuple. Replaced by the bitmaps of this level
+- support_counts (dict): If given, the support count of every frequent itemset is added to it
+
+Returns:
+- The frequent itemset [frozenset] that meets the minimum support threshold
+"""
+def frequent_item_set_vertical(transactions, candidates, min_support, tid_bitmaps=None, prefix_cache=None, support_counts=None):
+    if tid_bitmaps is None:
+        tid_bitmaps = build_tid_bitmaps(transactions)
+    if prefix_cache is None:
+        prefix_cache = {}
+    transaction_count = len(transactions)
+    min_support_count = min_support * transaction_count / 100
+
+    frequent_itemsets = set()
+    level_cache = {}
+    for candidate in candidates:
+        items = tuple(sorted(candidate))
+        bitmap = prefix_cache.get(items[:-1])
+        if bitmap is None:
+            # No cached prefix (e.g. level 1), intersect the bitmaps of all the items
+            bitmap = tid_bitmaps.get(items[0], 0)
+            for item in items[1:]:
+                bitmap &= tid_bitmaps.get(item, 0)
+        else:
+            bitmap &= tid_bitmaps.get(items[-1], 0)
+        count = bitmap.bit_count()
+        if count >= min_support_count:
+            frequent_itemsets.add(candidate)
+            level_cache[items] = bitmap
+            if support_counts is not None:
+                support_counts[candidate] = count
+
+    prefix_cache.clear()
+    prefix_cache.update(level_cache)
+    return frequent_itemsets
+
+
+"""
+CandidateTrie class that indexes the candidates of one level in a prefix trie keyed on their sorted items. Every node is a list
+[children, candidate index], where the index is -1 for nodes that do not end a candidate. A transaction is walked through the trie once
+with its items sorted, which enumerates every candidate contained in it, instead of testing every candidate against the transaction.
+"""
+class CandidateTrie:
+    def __init__(self, candidates):
+        self.candidates = list(candidates)
+        self.counts = [0] * len(self.candidates)
+        self.k = max((len(candidate) for candidate in self.candidates), default=0)
+        self.root = [{}, -1]
+        for index, candidate in enumerate(self.candidates):
+            node = self.root
+            for item in sorted(candidate):
+                children = node[0]
+                if item not in children:
+                    children[item] = [{}, -1]
+                node = children[item]
+            node[1] = index
+
+    """
+    Function that increases the count of every candidate contained in a transaction
+
+    Parameters:
+    - items (list): The items of the transaction in sorted order
+    """
+    def add_transaction(self, items):
+        counts, k, num_items = self.counts, self.k, len(items)
+        if k == 0:
+            return
+        stack = [(self.root, 0, 0)]
+        while stack:
+            node, start, depth = stack.pop()
+            children = node[0]
+            # Stop early when there are not enough items left to complete a candidate
+            for position in range(start, num_items - (k - depth) + 1):
+                child = children.get(items[position])
+                if child is None:
+                    continue
+                if child[1] >= 0:
+                    counts[child[1]] += 1
+                if child[0]:
+                    stack.append((child, position + 1, depth + 1))
+
+"""
+This functions does the same as frequent_item_set, but the candidates are put in a CandidateTrie and every transaction is walked through it once
+
+Parameters:
+- transactions (list[set]): The list of transactions
+- candidates (set[frozenset]): The candidate itemsets
+- min_support (float): The minimum support chosen by the user
+- support_counts (dict): If given, the support count of every frequent itemset is added to it
+
+Returns:
+- The frequent itemset [frozenset] that meets the minimum support threshold
+"""
+def frequent_item_set_trie(transactions, candidates, min_support, support_counts=None):
+    min_support_count = min_support * len(transactions) / 100
+    trie = CandidateTrie(candidates)
+    if isinstance(transactions, EncodedTransactions):
+        # The codes of every transaction are already stored sorted
+        items, offsets = transactions.items, transactions.offsets
+        for tid in range(len(transactions)):
+            trie.add_transaction(items[offsets[tid]:offsets[tid + 1]])
+    else:
+        for transaction in transactions:
+            trie.add_transaction(sorted(transaction))
+
+    frequent_itemsets = set()
+    for candidate, count in zip(trie.candidates, trie.counts):
+        if count >= min_support_count:
+            frequent_itemsets.add(candidate)
+            if support_counts is not None:
+                support_counts[candidate] = count
     return frequent_itemsets
 
+"""
+ShardedCounter class that counts candidate supports over shards of the transactions in a process pool. The flat code arrays of the
+transactions are copied once into shared memory, and every worker attaches to them when it starts, so the transactions are never
+pickled for a task. Only the candidates are sent to the workers, and the per-shard counts are summed in the parent.
+With use_trie the workers walk their shard through a CandidateTrie instead of testing every candidate against every transaction.
+"""
+class ShardedCounter:
+    def __init__(self, transactions, n_jobs, use_trie=False):
+        self.use_trie = use_trie
+        if isinstance(transactions, EncodedTransactions):
+            encoded = transactions
+            self.item_codes = None
+        else:
+            encoded = EncodedTransactions()
+            for transaction in transactions:
+                encoded.append(transaction)
+            self.item_codes = encoded.item_codes
+
+        self.shared_memory = []
+        for values in (encoded.items, encoded.offsets):
+            data = values.tobytes()
+            block = shared_memory.SharedMemory(create=True, size=max(len(data), 8))
+            block.buf[:len(data)] = data
+            self.shared_memory.append(block)
+
+        num_transactions = len(encoded)
+        shard_size = -(-num_transactions // n_jobs) or 1
+        self.shards = [(start, min(start + shard_size, num_transactions)) for start in range(0, num_transactions, shard_size)]
+        self.executor = ProcessPoolExecutor(n_jobs, initializer=_attach_shared_transactions,
+                                            initargs=(self.shared_memory[0].name, len(encoded.items), self.shared_memory[1].name, len(encoded.offsets)))
+
+    """
+    Function that counts the support of the candidates over all the shards
+
+    Parameters:
+    - candidates (set[frozenset]): The candidate itemsets
+
+    Returns:
+    - A dict mapping every candidate to its support count
+    """
+    def count(self, candidates):
+        candidates = list(candidates)
+        if self.item_codes is None:
+            encoded_candidates = candidates
+        else:
+            # Items that never occur get code -1, which is not in any transaction
+            encoded_candidates = [frozenset(self.item_codes.get(item, -1) for item in candidate) for candidate in candidates]
+        futures = [self.executor.submit(_count_shard, start, end, encoded_candidates, self.use_trie) for start, end in self.shards]
+
+        item_counts = dict.fromkeys(candidates, 0)
+        for future in futures:
+            for candidate, count in zip(candidates, future.result()):
+                item_counts[candidate] += count
+        return item_counts
+
+    def close(self):
+        self.executor.shutdown()
+        for block in self.shared_memory:
+            block.close()
+            block.unlink()
+
+# The transactions of a pool worker, attached from shared memory by _attach_shared_transactions
+_shared_items = None
+_shared_offsets = None
+_shared_memory = None
+
+def _attach_shared_transactions(items_name, num_items, offsets_name, num_offsets):
+    global _shared_items, _shared_offsets, _shared_memory
+    _shared_memory = [shared_memory.SharedMemory(name=items_name), shared_memory.SharedMemory(name=offsets_name)]
+    _shared_items = _shared_memory[0].buf.cast('i')[:num_items]
+    _shared_offsets = _shared_memory[1].buf.cast('q')[:num_offsets]
+
+def _count_shard(start, end, candidates, use_trie):
+    if use_trie:
+        trie = CandidateTrie(candidates)
+        for tid in range(start, end):
+            trie.add_transaction(_shared_items[_shared_offsets[tid]:_shared_offsets[tid + 1]])
+        return trie.counts
+
+    return count_encoded(_shared_items, _shared_offsets, start, end, candidates)
 
 """
-This function is responsible for generating association rules from the frequent itemsets based on the minimum confidence
+This functions does the same as frequent_item_set, but the supports are counted by a ShardedCounter on multiple processes
+
+Parameters:
+- transactions (list[set]): The list of transactions
+- candidates (set[frozenset]): The candidate itemsets
+- min_support (float): The minimum support chosen by the user
+- counter (ShardedCounter): The counter holding the shared transactions and the process pool
+- support_counts (dict): If given, the support count of every frequent itemset is added to it
+
+Returns:
+- The frequent itemset [frozenset] that meets the minimum support threshold
+"""
+def frequent_item_set_parallel(transactions, candidates, min_support, counter, support_counts=None):
+    min_support_count = min_support * len(transactions) / 100
+    item_counts = counter.count(candidates)
+    frequent_itemsets = {item for item, count in item_counts.items() if count >= min_support_count}
+    if support_counts is not None:
+        support_counts.update((itemset, item_counts[itemset]) for itemset in frequent_itemsets)
+    return frequent_itemsets
+
+"""
+This function is responsible for generating association rules from the frequent itemsets based on the minimum confidence.
+The consequents of every itemset are grown level-wise from 1-item consequents. Moving an item from the antecedent to the consequent
+can only lower the confidence, so only consequents whose rule met min_conf are joined into the consequents of the next level.
 
 Parameters:
 - frequent_itemsets (set[frozenset]): The set of frequent itemsets
 - transcations (list[set]): The transactions 
 - min_conf (float): The minimum confidence threshold
+- support_counts (dict): The support counts of the frequent itemsets as returned by apriori(..., return_counts=True).
+If not given, they are counted by scanning the transactions
+- transaction_count (int): The number of transactions. Only needed when transactions is None and the support counts are given
+
+Returns:
+- A list of rules (antecedent, consequent, support, confidence) with support and confidence in percent
 """
-def association_rules(frequent_itemsets, transactions, min_conf):
-    rules = []
-    itemset_support = {itemset: calc_support(itemset, transactions) for itemset in frequent_itemsets}
-    
+def association_rules(frequent_itemsets, transactions, min_conf, support_counts=None, transaction_count=None):
+    return list(iter_association_rules(frequent_itemsets, transactions, min_conf, support_counts, transaction_count))
+
+"""
+This function does the same as association_rules, but yields the rules one at a time instead of building the whole list,
+so write_output or top_k_rules can consume them with bounded memory.
+
+Parameters:
+- The same as association_rules
+
+Returns:
+- A generator of rules (antecedent, consequent, support, confidence) with support and confidence in percent
+"""
+def iter_association_rules(frequent_itemsets, transactions, min_conf, support_counts=None, transaction_count=None):
+    if transaction_count is None:
+        transaction_count = len(transactions)
+    if support_counts is None:
+        if isinstance(transactions, EncodedTransactions):
+            frequent_itemsets = list(frequent_itemsets)
+            counts = count_encoded(transactions.items, transactions.offsets, 0, len(transactions), frequent_itemsets)
+            support_counts = dict(zip(frequent_itemsets, counts))
+        else:
+            support_counts = {itemset: sum(1 for transaction in transactions if itemset.issubset(transaction)) for itemset in frequent_itemsets}
+
     for itemset in frequent_itemsets:
-        for subset in gen_subset(itemset):
-            if subset and itemset > subset:
-                remaining = itemset - subset
-                if remaining:
-                    subset_support = itemset_support[subset]
-                    itemset_support_val = itemset_support[itemset]
-                    confidence = itemset_support_val / subset_support
-                    if confidence >= min_conf / 100:
-                        rules.append((subset, remaining, itemset_support_val * 100, confidence * 100)) # To two decimal
-    return rules
+        itemset_count = support_counts[itemset]
+        consequents = [frozenset([item]) for item in itemset]
+        m = 1
+        while consequents and m < len(itemset):
+            confident_consequents = set()
+            for consequent in consequents:
+                antecedent = itemset - consequent
+                confidence = itemset_count / support_counts[antecedent]
+                if confidence >= min_conf / 100:
+                    yield (antecedent, consequent, itemset_count / transaction_count * 100, confidence * 100) # To two decimal
+                    confident_consequents.add(consequent)
+            m += 1
+            consequents = generate_candidate_itemsets(m, confident_consequents, None) if m < len(itemset) else []
+
+"""
+This function keeps only the best k rules in a bounded min-heap, so the rules can be streamed without holding all of them in memory
+
+Parameters:
+- rules: The rules, e.g. from iter_association_rules
+- k (int): The number of rules to keep, no rules are kept when it is not positive
+- rank_by (str): 'confidence' or 'lift'. The lift is the confidence divided by the support of the consequent
+- support_counts (dict): The support counts of the frequent itemsets, needed for the lift
+- transaction_count (int): The number of transactions, needed for the lift
+
+Returns:
+- A list of the best k rules, best first
+"""
+def top_k_rules(rules, k, rank_by='confidence', support_counts=None, transaction_count=None):
+    if rank_by not in ('confidence', 'lift'):
+        raise Exception(f"Unknown rule ranking: {rank_by}")
+    if rank_by == 'lift' and (support_counts is None or transaction_count is None):
+        raise Exception("Ranking by lift needs support_counts and transaction_count")
+    if k <= 0:
+        return []
+    heap = []
+    for position, rule in enumerate(rules):
+        antecedent, consequent, support, confidence = rule
+        score = confidence
+        if rank_by == 'lift':
+            score = confidence / (support_counts[consequent] / transaction_count * 100)
+        # The position breaks ties so the itemsets themselves are never compared
+        entry = (score, -position, rule)
+        if len(heap) < k:
+            heapq.heappush(heap, entry)
+        elif entry > heap[0]:
+            heapq.heapreplace(heap, entry)
+    return [rule for _, _, rule in sorted(heap, reverse=True)]
 
 """
 This function implements the apriori algorithm in accordance with the lecture slides explained by the professor
 
 Parameters:
 - transactions:
-- min_support: 
+- min_support:
+- engine (str): 'horizontal' scans the transactions for every candidate, 'vertical' intersects transaction-ID bitmaps,
+'trie' walks every transaction once through a CandidateTrie of the candidates
+- n_jobs (int): Number of processes counting the supports over shards of the transactions (horizontal and trie engines only)
+- return_counts (bool): Also return the support counts of the frequent itemsets, which association_rules can reuse
 
-Returns: 
-- All the frequent itemsets found based on the apriori algorithm
+Returns:
+- All the frequent itemsets found based on the apriori algorithm, and a dict with their support counts if return_counts is set
 """
-def apriori(transactions, min_support):
+def apriori(transactions, min_support, engine='horizontal', n_jobs=1, return_counts=False):
+    support_counts = {}
+    if n_jobs > 1:
+        if engine not in ('horizontal', 'trie'):
+            raise Exception(f"n_jobs is not supported by the {engine} engine")
+        counter = ShardedCounter(transactions, n_jobs, use_trie=engine == 'trie')
+        try:
+            all_freq_itemsets = _apriori_levels(transactions, min_support, support_counts,
+                                                lambda transactions, candidates, min_support, support_counts:
+                                                frequent_item_set_parallel(transactions, candidates, min_support, counter, support_counts))
+        finally:
+            counter.close()
+        return (all_freq_itemsets, support_counts) if return_counts else all_freq_itemsets
+
+    if engine == 'horizontal':
+        frequent_item_set_engine = frequent_item_set
+    elif engine == 'trie':
+        frequent_item_set_engine = frequent_item_set_trie
+    elif engine == 'vertical':
+        tid_bitmaps = build_tid_bitmaps(transactions)
+        prefix_cache = {}
+        def frequent_item_set_engine(transactions, candidates, min_support, support_counts):
+            return frequent_item_set_vertical(transactions, candidates, min_support, tid_bitmaps, prefix_cache, support_counts)
+    else:
+        raise Exception(f"Unknown counting engine: {engine}")
+    all_freq_itemsets = _apriori_levels(transactions, min_support, support_counts, frequent_item_set_engine)
+    return (all_freq_itemsets, support_counts) if return_counts else all_freq_itemsets
+
+def _apriori_levels(transactions, min_support, support_counts, frequent_item_set_engine):
     k = 1
     all_freq_itemsets = []
 
     # Scan DB and get frequent 1 itemsets and then add them to all the frequent itemsets
     candidate_1_itemsets = generate_candidate_itemsets(k, set(), transactions)
-    frequent_1_itemsets = frequent_item_set(transactions, candidate_1_itemsets, min_support)
+    frequent_1_itemsets = frequent_item_set_engine(transactions, candidate_1_itemsets, min_support, support_counts)
     all_freq_itemsets.extend(frequent_1_itemsets)
 
     # Repeat with index [k]
@@ -195,7 +659,7 @@ def apriori(transactions, min_support):
         # Generate candidate itemsets of length (k+1) from frequent itemsets of length k
         candidate_itemsets = generate_candidate_itemsets(k, prev_level_frequent_itemsets, transactions)
         # Test against DB
-        current_level_frequent_itemsets = frequent_item_set(transactions, candidate_itemsets, min_support)
+        current_level_frequent_itemsets = frequent_item_set_engine(transactions, candidate_itemsets, min_support, support_counts)
         all_freq_itemsets.extend(current_level_frequent_itemsets)
         # Terminate when no frequent or candidate set can generated
         if not current_level_frequent_itemsets:
@@ -207,30 +671,68 @@ def apriori(transactions, min_support):
     return all_freq_itemsets
 
 """
-This functions has the function of writing and creating an output file
+This functions has the function of writing and creating an output file.
+The rules are consumed one at a time through a buffered writer, so they can come from a generator, and the formatted
+string of every itemset is cached, since the same antecedents and consequents come back in many rules.
 
 Parameters: 
 - rules: 
 - output_file: The output file to be created
+- vocabulary (list[str]): The item strings of an EncodedTransactions, used to decode rules mined from integer codes
 """
-def write_output(rules, output_file):
-    with open(output_file, 'w') as file:
+def write_output(rules, output_file, vocabulary=None):
+    itemset_strs = {}
+    def itemset_str(itemset):
+        formatted = itemset_strs.get(itemset)
+        if formatted is None:
+            items = itemset if vocabulary is None else [vocabulary[code] for code in itemset]
+            formatted = itemset_strs[itemset] = ', '.join(sorted(map(str, items)))
+        return formatted
+
+    with open(output_file, 'w', buffering=1 << 20) as file:
         for antecedent, consequent, support, confidence in rules:
-            antecedent_str = ', '.join(sorted(map(str, antecedent)))
-            consequent_str = ', '.join(sorted(map(str, consequent)))
-            
-            file.write(f"{{{antecedent_str}}}\t{{{consequent_str}}}\t{support:.2f}\t{confidence:.2f}\n")
+            file.write(f"{{{itemset_str(antecedent)}}}\t{{{itemset_str(consequent)}}}\t{support:.2f}\t{confidence:.2f}\n")
 
 if __name__ == "__main__":
-    if len(sys.argv) != 4:
-        raise Exception("Usage: [program] <min_support> <input_file> <output_file>")
-    
-    min_support = float(sys.argv[1])
-    input_file = sys.argv[2]
-    output_file = sys.argv[3]
-    
-    transactions = file_reader(input_file)
-    frequent_itemsets = apriori(transactions, min_support)
-    association_rules_list = association_rules(frequent_itemsets, transactions, min_support)
-    
-    write_output(association_rules_list, output_file)
+    parser = argparse.ArgumentParser(usage="[program] <min_support> <input_file> <output_file> [--algorithm {apriori,fpgrowth,closed,maximal}]")
+    parser.add_argument("min_support", type=float)
+    parser.add_argument("input_file")
+    parser.add_argument("output_file")
+    parser.add_argument("--algorithm", choices=["apriori", "fpgrowth", "closed", "maximal"], default="apriori",
+                        help="closed and maximal mine only those itemsets and derive the other frequent itemsets for the rules")
+    parser.add_argument("--engine", choices=["horizontal", "vertical", "trie"], default="horizontal", help="support counting engine (apriori only)")
+    parser.add_argument("--n-jobs", type=int, default=1, help="number of processes counting the supports (apriori only)")
+    parser.add_argument("--top-k", type=int, help="only write the best K rules")
+    parser.add_argument("--rank-by", choices=["confidence", "lift"], default="confidence", help="ranking used by --top-k")
+    parser.add_argument("--encoded", action="store_true", help="intern the items into integer codes while reading the input")
+    parser.add_argument("--mmap", action="store_true", help="read the input through mmap (implies --encoded)")
+    args = parser.parse_args()
+
+    min_support = args.min_support
+    input_file = args.input_file
+    output_file = args.output_file
+
+    vocabulary = None
+    if args.encoded or args.mmap:
+        transactions = encoded_file_reader(input_file, use_mmap=args.mmap)
+        vocabulary = transactions.vocabulary
+    else:
+        transactions = file_reader(input_file)
+    if args.algorithm == "fpgrowth":
+        frequent_itemsets, support_counts = fp_growth(transactions, min_support, return_counts=True)
+    elif args.algorithm in ("closed", "maximal"):
+        # Imported here because ClosedMaximal imports this module
+        from ClosedMaximal import charm, expand_closed, expand_maximal, maximal_itemsets
+        if args.algorithm == "closed":
+            _, closed_counts = charm(transactions, min_support, return_counts=True)
+            support_counts = dict(expand_closed(closed_counts))
+        else:
+            support_counts = dict(expand_maximal(maximal_itemsets(transactions, min_support), transactions))
+        frequent_itemsets = list(support_counts)
+    else:
+        frequent_itemsets, support_counts = apriori(transactions, min_support, engine=args.engine, n_jobs=args.n_jobs, return_counts=True)
+    association_rules_list = iter_association_rules(frequent_itemsets, transactions, min_support, support_counts)
+    if args.top_k is not None:
+        association_rules_list = top_k_rules(association_rules_list, args.top_k, args.rank_by, support_counts, len(transactions))
+
+    write_output(association_rules_list, output_file, vocabulary)
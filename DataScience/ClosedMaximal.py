@@ -0,0 +1,199 @@
+from itertools import combinations
+from Apriori import build_tid_bitmaps
+"""
+Mining of closed and maximal frequent itemsets over the same transactions as apriori in Apriori.py. A frequent itemset is closed
+when no superset has the same support, and maximal when no superset is frequent at all. Both searches work on the transaction-ID
+bitmaps of build_tid_bitmaps, so the support of an itemset is the popcount of its bitmap.
+"""
+
+"""
+This function sets up the depth-first searches. It builds the item bitmaps and keeps the frequent items ordered on increasing support,
+which keeps the search trees small because the rarest items are extended first.
+
+Parameters:
+- transactions (list[set]): The list of transactions
+- min_support (float): The minimum support in percent
+
+Returns:
+- The minimum support count and a list of (item, bitmap) pairs of the frequent items
+"""
+def _frequent_item_bitmaps(transactions, min_support):
+    min_support_count = min_support * len(transactions) / 100
+    tid_bitmaps = build_tid_bitmaps(transactions)
+    items = [(item, bitmap) for item, bitmap in tid_bitmaps.items() if bitmap.bit_count() >= min_support_count]
+    items.sort(key=lambda pair: (pair[1].bit_count(), pair[0]))
+    return min_support_count, items
+
+"""
+This function is the recursive step of CHARM. Every node is an [itemset, bitmap] pair. Joining node i with a later node j
+uses the four CHARM properties: equal bitmaps merge j into i, a bitmap of i contained in the one of j extends i with j,
+and otherwise the join becomes a child of i (j is removed when its bitmap is contained in the one of i).
+
+Parameters:
+- nodes (list): The [itemset, bitmap] pairs of one equivalence class
+- min_support_count (float): The minimum support count
+- closed (dict): Maps the bitmap of every closed itemset found to the itemset
+"""
+def _charm_extend(nodes, min_support_count, closed):
+    removed = [False] * len(nodes)
+    for i in range(len(nodes)):
+        if removed[i]:
+            continue
+        itemset, bitmap = nodes[i]
+        children = []
+        for j in range(i + 1, len(nodes)):
+            if removed[j]:
+                continue
+            other_itemset, other_bitmap = nodes[j]
+            joined = bitmap & other_bitmap
+            if joined.bit_count() < min_support_count:
+                continue
+            if bitmap == other_bitmap:
+                removed[j] = True
+                itemset = itemset | other_itemset
+            elif joined == bitmap:
+                itemset = itemset | other_itemset
+            elif joined == other_bitmap:
+                removed[j] = True
+                children.append((other_itemset, joined))
+            else:
+                children.append((other_itemset, joined))
+        if children:
+            _charm_extend([[itemset | child_itemset, child_bitmap] for child_itemset, child_bitmap in children], min_support_count, closed)
+        # Itemsets with the same bitmap have the same closure, so a bitmap seen before means it is subsumed
+        closed[bitmap] = closed.get(bitmap, frozenset()) | itemset
+
+"""
+This function implements CHARM to mine only the closed frequent itemsets.
+
+Parameters:
+- transactions (list[set]): The list of transactions
+- min_support (float): The minimum support in percent
+- return_counts (bool): Also return the support counts of the closed itemsets
+
+Returns:
+- All the closed frequent itemsets [frozenset], and a dict with their support counts if return_counts is set
+"""
+def charm(transactions, min_support, return_counts=False):
+    min_support_count, items = _frequent_item_bitmaps(transactions, min_support)
+    closed = {}
+    _charm_extend([[frozenset([item]), bitmap] for item, bitmap in items], min_support_count, closed)
+    support_counts = {itemset: bitmap.bit_count() for bitmap, itemset in closed.items()}
+    if return_counts:
+        return list(support_counts), support_counts
+    return list(support_counts)
+
+"""
+This function derives all the frequent itemsets and their support counts from the closed ones, lazily.
+The support of an itemset is the support of its largest closed superset, so the closed itemsets are expanded in descending order
+of support and every subset is yielded the first time it is seen.
+
+Parameters:
+- closed_counts (dict): The closed itemsets and their support counts as returned by charm(..., return_counts=True)
+
+Returns:
+- A generator of (itemset, support count) pairs of all the frequent itemsets
+"""
+def expand_closed(closed_counts):
+    seen = set()
+    for closed_itemset in sorted(closed_counts, key=closed_counts.get, reverse=True):
+        items = sorted(closed_itemset)
+        for size in range(len(items), 0, -1):
+            for subset in combinations(items, size):
+                subset = frozenset(subset)
+                if subset not in seen:
+                    seen.add(subset)
+                    yield subset, closed_counts[closed_itemset]
+
+"""
+This function is the recursive step of the maximal itemset search. Tail items whose bitmap contains the bitmap of the head
+are moved into the head (parent equivalence pruning), and a branch is skipped when the head together with its whole tail is already
+contained in a maximal itemset found before (lookahead). A head without frequent extensions is maximal unless it is contained in one found before.
+Only the maximal itemsets containing the head can subsume anything in this branch, so every call checks against that local list (progressive focusing).
+
+Parameters:
+- head (frozenset): The itemset of the current node
+- head_bitmap (int): The bitmap of the head
+- tail (list): The (item, bitmap) pairs that extend the head to a frequent itemset
+- min_support_count (float): The minimum support count
+- local_maximal (list): The maximal itemsets found so far that contain the head. New ones found in this branch are appended
+"""
+def _maximal_extend(head, head_bitmap, tail, min_support_count, local_maximal):
+    equivalent = frozenset(item for item, bitmap in tail if bitmap == head_bitmap)
+    if equivalent:
+        head = head | equivalent
+        tail = [(item, bitmap) for item, bitmap in tail if item not in equivalent]
+    focused = [itemset for itemset in local_maximal if head <= itemset]
+
+    if not tail:
+        if head and not focused:
+            local_maximal.append(head)
+        return
+    everything = head | frozenset(item for item, _ in tail)
+    if any(everything <= itemset for itemset in focused):
+        return
+
+    for position, (item, bitmap) in enumerate(tail):
+        new_tail = []
+        for other_item, other_bitmap in tail[position + 1:]:
+            joined = bitmap & other_bitmap
+            if joined.bit_count() >= min_support_count:
+                new_tail.append((other_item, joined))
+        child_maximal = [itemset for itemset in focused if item in itemset]
+        num_known = len(child_maximal)
+        _maximal_extend(head | {item}, bitmap, new_tail, min_support_count, child_maximal)
+        focused.extend(child_maximal[num_known:])
+        local_maximal.extend(child_maximal[num_known:])
+
+"""
+This function mines only the maximal frequent itemsets with a GenMax-style depth-first search over the item bitmaps.
+
+Parameters:
+- transactions (list[set]): The list of transactions
+- min_support (float): The minimum support in percent
+- return_counts (bool): Also return the support counts of the maximal itemsets
+
+Returns:
+- All the maximal frequent itemsets [frozenset], and a dict with their support counts if return_counts is set
+"""
+def maximal_itemsets(transactions, min_support, return_counts=False):
+    min_support_count, items = _frequent_item_bitmaps(transactions, min_support)
+    maximal = []
+    _maximal_extend(frozenset(), (1 << len(transactions)) - 1, items, min_support_count, maximal)
+    if not return_counts:
+        return maximal
+    tid_bitmaps = dict(items)
+    support_counts = {}
+    for itemset in maximal:
+        bitmap = (1 << len(transactions)) - 1
+        for item in itemset:
+            bitmap &= tid_bitmaps[item]
+        support_counts[itemset] = bitmap.bit_count()
+    return maximal, support_counts
+
+"""
+This function derives all the frequent itemsets and their support counts from the maximal ones, lazily. Every frequent itemset
+is a subset of a maximal itemset, but the maximal itemsets do not tell its support, so it is counted from the item bitmaps.
+
+Parameters:
+- maximal (list[frozenset]): The maximal itemsets as returned by maximal_itemsets
+- transactions (list[set]): The list of transactions the maximal itemsets were mined from
+
+Returns:
+- A generator of (itemset, support count) pairs of all the frequent itemsets
+"""
+def expand_maximal(maximal, transactions):
+    tid_bitmaps = build_tid_bitmaps(transactions)
+    all_transactions = (1 << len(transactions)) - 1
+    seen = set()
+    for maximal_itemset in maximal:
+        items = sorted(maximal_itemset)
+        for size in range(len(items), 0, -1):
+            for subset in combinations(items, size):
+                subset = frozenset(subset)
+                if subset not in seen:
+                    seen.add(subset)
+                    bitmap = all_transactions
+                    for item in subset:
+                        bitmap &= tid_bitmaps[item]
+                    yield subset, bitmap.bit_count()
@@ -0,0 +1,85 @@
+import argparse
+import itertools
+import json
+import time
+import numpy as np
+import pandas as pd
+from DecisionTreeClassifier import DecisionTreeClassifier
+"""
+Benchmark of DecisionTreeClassifier on synthetic data. For every combination of rows, features and classes a dataset is generated
+from a fixed seed, so the numbers of two runs are comparable, and the fit and predict throughput are reported in rows per second.
+"""
+
+"""
+Function that generates a synthetic classification dataset. The features are Gaussian and the class of a row is the one whose
+random direction has the largest projection, with some noise added so the trees do not become pure immediately.
+
+Parameters:
+- num_rows: The number of rows
+- num_features: The number of features
+- num_classes: The number of classes
+- seed: The seed of the random generator
+
+Returns:
+- The feature matrix X and the target values Y
+"""
+def make_dataset(num_rows, num_features, num_classes, seed):
+    rng = np.random.default_rng([seed, num_rows, num_features, num_classes])
+    values = rng.normal(size=(num_rows, num_features))
+    directions = rng.normal(size=(num_features, num_classes))
+    scores = values @ directions + rng.normal(scale=0.5, size=(num_rows, num_classes))
+    X = pd.DataFrame(values.round(3), columns=[f"f{feature_index}" for feature_index in range(num_features)])
+    Y = pd.Series(np.argmax(scores, axis=1).astype(str))
+    return X, Y
+
+"""
+Function that times fit and predict on one dataset, keeping the fastest of the repeats
+
+Parameters:
+- X: The feature matrix
+- Y: The target values
+- params: The keyword arguments of DecisionTreeClassifier
+- repeat: The number of times fit and predict are run
+
+Returns:
+- A dict with the fit and predict times, throughputs and the number of nodes of the tree
+"""
+def benchmark(X, Y, params, repeat):
+    fit_seconds = predict_seconds = float("inf")
+    for _ in range(repeat):
+        tree = DecisionTreeClassifier(**params)
+        start = time.perf_counter()
+        tree.fit(X, Y)
+        fit_seconds = min(fit_seconds, time.perf_counter() - start)
+        start = time.perf_counter()
+        tree.predict(X)
+        predict_seconds = min(predict_seconds, time.perf_counter() - start)
+    return {"fit_seconds": fit_seconds, "predict_seconds": predict_seconds, "fit_rows_per_second": len(X) / fit_seconds,
+            "predict_rows_per_second": len(X) / predict_seconds, "nodes": len(tree.tree_arrays["value"])}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark DecisionTreeClassifier fit and predict on synthetic data")
+    parser.add_argument("--rows", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--features", type=int, nargs="+", default=[10])
+    parser.add_argument("--classes", type=int, nargs="+", default=[2, 5])
+    parser.add_argument("--max-depth", type=int, default=8)
+    parser.add_argument("--max-bins", type=int)
+    parser.add_argument("--n-jobs", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="also write the results to this JSON file")
+    args = parser.parse_args()
+
+    params = {"max_depth": args.max_depth, "max_bins": args.max_bins, "n_jobs": args.n_jobs}
+    results = []
+    print(f"{'rows':>9} {'features':>8} {'classes':>7} {'nodes':>6} {'fit_s':>8} {'fit_rows/s':>11} {'predict_s':>9} {'predict_rows/s':>14}")
+    for num_rows, num_features, num_classes in itertools.product(args.rows, args.features, args.classes):
+        X, Y = make_dataset(num_rows, num_features, num_classes, args.seed)
+        result = {"rows": num_rows, "features": num_features, "classes": num_classes, **benchmark(X, Y, params, args.repeat)}
+        results.append(result)
+        print(f"{num_rows:>9} {num_features:>8} {num_classes:>7} {result['nodes']:>6} {result['fit_seconds']:>8.3f} "
+              f"{result['fit_rows_per_second']:>11.0f} {result['predict_seconds']:>9.3f} {result['predict_rows_per_second']:>14.0f}")
+
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump({"params": params, "seed": args.seed, "results": results}, file, indent=2)
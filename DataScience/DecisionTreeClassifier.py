@@ -1,4 +1,11 @@
+import argparse
+import json
+import os
 import sys
+import tempfile
+import time
+from statistics import NormalDist
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 import numpy as np
 import pandas as pd
 """
@@ -22,70 +29,658 @@ Parameters:
 def file_writer(data, file_path):
     data.to_csv(file_path, sep="\t", index=False)
 """
-Node class to determine the characteristics of the nodes in our tree
+Function that finds the categorical features, the columns that do not hold numbers
+
+Parameters:
+- X: The feature matrix
+
+Returns:
+- A dict mapping the index of every categorical feature to the sorted array of its categories, without missing values
+"""
+def find_categories(X):
+    categories = {}
+    for feature_index in range(X.shape[1]):
+        column = X.iloc[:, feature_index]
+        if not pd.api.types.is_numeric_dtype(column):
+            # The categories are found by hashing, only the distinct values are sorted
+            categories[feature_index] = np.sort(pd.unique(column.dropna().to_numpy()))
+    return categories
+"""
+Function that finds the category code of every value of a column. A column that was read as numbers (a test file or a chunk
+can hold only values like 1 and 2 of a categorical feature) is first turned into the strings the categories were read as.
+
+Parameters:
+- column: The values of a categorical feature
+- categories: The sorted categories of the feature, as returned by find_categories
+
+Returns:
+- Array with the index of the category of every value, -1 for a missing value or a category that is not in categories
+"""
+def category_codes(column, categories):
+    missing = column.isna().to_numpy()
+    if pd.api.types.is_numeric_dtype(column) and any(isinstance(category, str) for category in categories):
+        if pd.api.types.is_float_dtype(column) and (column.dropna() % 1 == 0).all():
+            # Integers are read as floats when the column has missing values, 1.0 has to match the category "1"
+            column = column.astype("Int64")
+        column = column.astype(str)
+    codes = pd.Index(categories).get_indexer(column)
+    codes[missing] = -1
+    return codes
+"""
+Function that turns the features into a float matrix for prediction. A categorical feature becomes the index of its category,
+and missing values as well as categories that were not seen in training become NaN.
+
+Parameters:
+- X: The input data containing features
+- num_features: The number of features, the columns after them are ignored
+- categories: The categories of every categorical feature, as returned by find_categories
+
+Returns:
+- 2D float array with the encoded feature values
+"""
+def encode_features(X, num_features, categories):
+    if not categories:
+        return X.iloc[:, :num_features].to_numpy(dtype=np.float64)
+    values = np.empty((len(X), num_features))
+    for feature_index in range(num_features):
+        column = X.iloc[:, feature_index]
+        if feature_index in categories:
+            codes = category_codes(column, categories[feature_index])
+            values[:, feature_index] = np.where(codes < 0, np.nan, codes)
+        else:
+            values[:, feature_index] = column.to_numpy(dtype=np.float64)
+    return values
+"""
+Function that routes rows through compiled tree arrays. All the (row, node) pairs that have not reached a leaf take one step
+down per iteration. A numeric node sends a row left when its value is at most the threshold, a categorical node when the
+category_left entry of its category is set, and a missing value follows missing_left.
+
+Parameters:
+- tree_arrays: The compiled arrays of one or more trees, see compile_tree
+- values: 2D array with the encoded feature values of the rows
+- node_ids: The node every pair starts at, updated in place with the leaf it reaches
+- rows: The row of values of every pair
+
+Returns:
+- The array node_ids
+"""
+def route_rows(tree_arrays, values, node_ids, rows):
+    feature_index = tree_arrays["feature_index"]
+    threshold = tree_arrays["threshold"]
+    left = tree_arrays["left"]
+    right = tree_arrays["right"]
+    missing_left = tree_arrays["missing_left"]
+    category_offset = tree_arrays["category_offset"]
+    category_left = tree_arrays["category_left"]
+
+    active = np.arange(len(node_ids))
+    while active.size:
+        current = node_ids[active]
+        internal = feature_index[current] >= 0
+        active, current = active[internal], current[internal]
+        feature_values = values[rows[active], feature_index[current]]
+        missing = np.isnan(feature_values)
+        goes_left = feature_values <= threshold[current]
+        offsets = category_offset[current]
+        categorical = (offsets >= 0) & ~missing
+        if categorical.any():
+            goes_left[categorical] = category_left[offsets[categorical] + feature_values[categorical].astype(np.int64)]
+        goes_left = np.where(missing, missing_left[current], goes_left)
+        node_ids[active] = np.where(goes_left, left[current], right[current])
+    return node_ids
+"""
+Function that predicts a test file in chunks and appends every chunk with its predictions to the output file, so the memory
+used depends on chunksize and not on the size of the test file. With pipeline set, the next chunk is read and the previous one
+is written on threads while the current chunk is predicted.
+
+Parameters:
+- model: A fitted or loaded classifier
+- test_file: The test file to be read
+- output_file: The file that will store the test data with a predicted column
+- chunksize: The number of rows read and predicted at once
+- pipeline: Overlap reading and writing with predicting
+"""
+def stream_predict(model, test_file, output_file, chunksize, pipeline=False):
+    # A chunk could read a categorical feature as numbers, so the categorical features with string categories are read as strings
+    columns = pd.read_csv(test_file, delimiter="\t", nrows=0).columns
+    dtype = {columns[feature_index]: str for feature_index, categories in model.categories_.items()
+             if feature_index < len(columns) and any(isinstance(category, str) for category in categories)}
+    chunks = pd.read_csv(test_file, delimiter="\t", chunksize=chunksize, dtype=dtype)
+    with open(output_file, "w", newline="") as file:
+        if not pipeline:
+            for position, chunk in enumerate(chunks):
+                chunk['predicted'] = model.predict(chunk)
+                chunk.to_csv(file, sep="\t", index=False, header=position == 0)
+            return
+
+        with ThreadPoolExecutor(2) as executor:
+            pending_chunk = executor.submit(next, chunks, None)
+            pending_write = None
+            position = 0
+            while True:
+                chunk = pending_chunk.result()
+                if chunk is None:
+                    break
+                pending_chunk = executor.submit(next, chunks, None)
+                chunk['predicted'] = model.predict(chunk)
+                # The chunks are written one at a time to keep them in order
+                if pending_write is not None:
+                    pending_write.result()
+                pending_write = executor.submit(chunk.to_csv, file, sep="\t", index=False, header=position == 0)
+                position += 1
+            if pending_write is not None:
+                pending_write.result()
+"""
+Node class to determine the characteristics of the nodes in our tree. A categorical split has the category codes that go left
+in categories instead of a threshold, and missing_left is the side that samples with a missing value go to.
+counts holds the number of training samples of every class that reached the node, which is what pruning works from.
 """
 class Node:
-    def __init__(self, feature_index=None, threshold=None, left=None, right=None, info_gain=None, value=None):
+    def __init__(self, feature_index=None, threshold=None, left=None, right=None, info_gain=None, value=None, categories=None, missing_left=False, counts=None):
         self.feature_index = feature_index
         self.threshold = threshold
         self.left = left
         self.right = right
         self.info_gain = info_gain
         self.value = value
+        self.categories = categories
+        self.missing_left = missing_left
+        self.counts = counts
+"""
+Placeholder for a subtree that is being built in the process pool of a parallel fit
+"""
+class PendingSubtree:
+    def __init__(self, future):
+        self.future = future
+"""
+TrainingProfiler class that records where the time of a fit goes. Every node built adds a record with its depth, the number
+of samples, the number of candidate splits whose gain ratio was computed, the time spent searching for the split (including
+the histograms in max_bins mode) and the time spent partitioning the samples. timings holds the time of the stages of fit.
+"""
+class TrainingProfiler:
+    def __init__(self):
+        self.nodes = []
+        self.timings = {}
+        self.scored = []
+    """
+    Function that adds the record of a node. The candidates scored since the previous record belong to this node.
+
+    Parameters:
+    - depth: The depth of the node
+    - num_samples: The number of training samples in the node
+    - search_seconds: The time spent searching for the split of the node
+    - partition_seconds: The time spent partitioning the samples, 0 for a leaf
+    - leaf: Whether the node became a leaf
+    """
+    def record(self, depth, num_samples, search_seconds, partition_seconds, leaf):
+        self.nodes.append({"depth": depth, "samples": num_samples, "candidates": int(sum(self.scored)),
+                           "search_seconds": search_seconds, "partition_seconds": partition_seconds, "leaf": leaf})
+        self.scored.clear()
+    """
+    Function that makes a table of the records summed per depth, followed by the stage timings
+
+    Returns:
+    - The table as a string
+    """
+    def summary(self):
+        lines = [f"{'depth':>5} {'nodes':>7} {'leaves':>7} {'samples':>11} {'candidates':>11} {'search_s':>9} {'partition_s':>11}"]
+        depths = sorted({node["depth"] for node in self.nodes})
+        for depth in depths + ["total"]:
+            nodes = [node for node in self.nodes if depth == "total" or node["depth"] == depth]
+            lines.append(f"{depth:>5} {len(nodes):>7} {sum(node['leaf'] for node in nodes):>7} {sum(node['samples'] for node in nodes):>11} "
+                         f"{sum(node['candidates'] for node in nodes):>11} {sum(node['search_seconds'] for node in nodes):>9.4f} "
+                         f"{sum(node['partition_seconds'] for node in nodes):>11.4f}")
+        for stage, seconds in self.timings.items():
+            lines.append(f"{stage}: {seconds:.4f}s")
+        return "\n".join(lines)
+    """
+    Function that writes the stage timings and all the node records to a JSON file
+
+    Parameters:
+    - path: The file that will store the profile
+    """
+    def save_json(self, path):
+        with open(path, "w") as file:
+            json.dump({"timings": self.timings, "nodes": self.nodes}, file)
 """
 DecisionTreeClassifier class that will contain the main logic and helper functions for classifying our data
 """
 class DecisionTreeClassifier:
-    def __init__(self, min_samples_split=2, max_depth=5):
+    # Nodes with fewer samples evaluate their features serially even when n_jobs > 1
+    PARALLEL_FEATURE_MIN_SAMPLES = 10000
+    # Multiclass categorical features with at most this many categories in a node try every subset, others only orderings
+    MAX_EXHAUSTIVE_CATEGORIES = 10
+    # The first bytes of a file written by save, and the alignment of the arrays in it
+    MODEL_MAGIC = b"DTCMODEL2"
+    MODEL_ALIGNMENT = 64
+
+    def __init__(self, min_samples_split=2, max_depth=5, max_bins=None, n_jobs=1, parallel_depth=2, max_features=None, random_state=None, pruning_confidence=None, profile=False):
         self.root = None
         self.min_samples_split = min_samples_split
         self.max_depth = max_depth
+        self.max_bins = max_bins
+        self.n_jobs = n_jobs
+        self.parallel_depth = parallel_depth
+        self.max_features = max_features
+        self.random_state = random_state
+        self.pruning_confidence = pruning_confidence
+        self.profile = profile
+        self._profiler = None
+        self._process_pool = None
+        self._thread_pool = None
     """
     Function that constructs the tree based on the data
 
     Parameters:
-    - data: Data from a given input file
+    - indices: Index array of the training samples that reach this node
     - current_depth: The depth level that the tree is currently constructing the tree on
+    - histogram: In max_bins mode, the class counts per feature and bin of the node, if already known
 
     Returns:
     - The tree built using the C4.5 algorithm where we utilise gain ration for selecting attributes
     """
-    def build_tree(self, data, current_depth=0):
-        num_samples, num_features = data.shape
+    def build_tree(self, indices, current_depth=0, histogram=None):
+        num_samples = len(indices)
+        parent_counts = np.bincount(self._labels[indices], minlength=len(self.classes_))
 
         if num_samples < self.min_samples_split or current_depth >= self.max_depth:
-            leaf_value = data.iloc[:, -1].mode()[0]
-            return Node(value=leaf_value)
-        
+            if self._profiler is not None:
+                self._profiler.record(current_depth, num_samples, 0.0, 0.0, True)
+            return Node(value=self.leaf_value(parent_counts), counts=parent_counts)
+        if self._process_pool is not None and current_depth == self.parallel_depth:
+            return PendingSubtree(self._process_pool.submit(_build_subtree, self._shared_directory, self.get_params(), indices, current_depth))
+
+        search_start = time.perf_counter()
+        features = self.sample_features(indices, current_depth)
+        if self.max_bins is None:
+            best_gain_ratio, best_feature, best_split = self.find_best_split(indices, parent_counts, features)
+        else:
+            if histogram is None:
+                histogram = self.bin_histogram(indices)
+            best_gain_ratio, best_feature, best_split = self.find_best_binned_split(histogram, parent_counts, features)
+        search_seconds = time.perf_counter() - search_start
+        if best_feature is None:
+            if self._profiler is not None:
+                self._profiler.record(current_depth, num_samples, search_seconds, 0.0, True)
+            return Node(value=self.leaf_value(parent_counts), counts=parent_counts)
+
+        # Only the winning split is materialized, as index arrays
+        partition_start = time.perf_counter()
+        best_threshold, best_categories, missing_left = best_split
+        if self.max_bins is None:
+            feature_values = self._columns[best_feature][indices]
+        else:
+            feature_values = self._binned[indices, best_feature]
+        if best_categories is not None:
+            goes_left = np.isin(feature_values, best_categories)
+        else:
+            goes_left = feature_values <= best_threshold
+        goes_left[self.missing_mask(feature_values, best_feature)] = missing_left
+        if self.max_bins is not None and best_categories is None:
+            best_threshold = self._bin_thresholds[best_feature][best_threshold]
+        left_indices, right_indices = indices[goes_left], indices[~goes_left]
+        partition_seconds = time.perf_counter() - partition_start
+
+        histogram_start = time.perf_counter()
+        left_histogram = right_histogram = None
+        if self.max_bins is not None and current_depth + 1 < self.max_depth:
+            # Only the smaller child is counted, the histogram of its sibling is the parent minus the smaller child
+            if len(left_indices) <= len(right_indices):
+                left_histogram = self.bin_histogram(left_indices)
+                right_histogram = histogram - left_histogram
+            else:
+                right_histogram = self.bin_histogram(right_indices)
+                left_histogram = histogram - right_histogram
+        if self._profiler is not None:
+            self._profiler.record(current_depth, num_samples, search_seconds + time.perf_counter() - histogram_start, partition_seconds, False)
+        left_tree = self.build_tree(left_indices, current_depth + 1, left_histogram)
+        right_tree = self.build_tree(right_indices, current_depth + 1, right_histogram)
+
+        return Node(feature_index=best_feature, threshold=best_threshold, left=left_tree, right=right_tree, info_gain=best_gain_ratio,
+                    categories=best_categories, missing_left=missing_left, counts=parent_counts)
+    """
+    Function that finds the split with the highest gain ratio in a node. Every feature column is sorted once, and the class counts
+    left of every candidate threshold come from a cumulative sum over the sorted labels, so the gain ratios of all the thresholds
+    of a feature are computed at once instead of splitting the data for every threshold.
+
+    Parameters:
+    - indices: Index array of the training samples in the node
+    - parent_counts: The number of samples of every class in the node
+    - features: The feature indices to consider in ascending order, all of them if None
+
+    Returns:
+    - The best gain ratio, feature index and split, a tuple of (threshold, left categories, missing_left) with one of the first two None.
+      The feature index is None when no split improves on a gain ratio of 0
+    """
+    def find_best_split(self, indices, parent_counts, features=None):
         best_gain_ratio = 0
         best_feature = None
-        best_threshold = None
-        best_subsets = None
-
-        for feature_index in range(num_features - 1):
-            feature_values = data.iloc[:, feature_index]
-            thresholds = np.unique(feature_values)
-            for threshold in thresholds:
-                left_subset = data[data.iloc[:, feature_index] <= threshold]
-                right_subset = data[data.iloc[:, feature_index] > threshold]
-                if len(left_subset) < self.min_samples_split or len(right_subset) < self.min_samples_split:
-                    continue
-
-                current_gain_ratio = self.gain_ratio(data.iloc[:, -1], left_subset.iloc[:, -1], right_subset.iloc[:, -1])
-                if current_gain_ratio > best_gain_ratio:
-                    best_gain_ratio = current_gain_ratio
-                    best_feature = feature_index
-                    best_threshold = threshold
-                    best_subsets = (left_subset, right_subset)
+        best_split = None
+        labels = self._labels[indices]
+        if features is None:
+            features = range(len(self._columns))
 
-        if best_feature is None:
-            leaf_value = data.iloc[:, -1].mode()[0]
-            return Node(value=leaf_value)
+        if self._thread_pool is not None and len(indices) >= self.PARALLEL_FEATURE_MIN_SAMPLES:
+            feature_splits = self._thread_pool.map(lambda feature_index: self.best_feature_split(feature_index, indices, labels, parent_counts), features)
+        else:
+            feature_splits = (self.best_feature_split(feature_index, indices, labels, parent_counts) for feature_index in features)
+        # The features are compared in order, so the result does not depend on how they were evaluated
+        for feature_index, (gain_ratio, split) in zip(features, feature_splits):
+            if gain_ratio > best_gain_ratio:
+                best_gain_ratio = gain_ratio
+                best_feature = feature_index
+                best_split = split
+
+        return best_gain_ratio, best_feature, best_split
+    """
+    Function that draws the random subset of features a node may split on when max_features is set. The generator is seeded
+    with the depth and the first sample of the node, which identify the node, so a parallel fit draws the same subsets as a serial one.
+
+    Parameters:
+    - indices: Index array of the training samples in the node
+    - current_depth: The depth of the node
+
+    Returns:
+    - The sorted feature indices, or None to consider all the features
+    """
+    def sample_features(self, indices, current_depth):
+        if self.max_features is None:
+            return None
+        num_features = self.num_features
+        if self.max_features == "sqrt":
+            num_selected = int(np.sqrt(num_features))
+        elif self.max_features == "log2":
+            num_selected = int(np.log2(num_features))
+        elif isinstance(self.max_features, float):
+            num_selected = int(self.max_features * num_features)
+        else:
+            num_selected = self.max_features
+        num_selected = min(max(num_selected, 1), num_features)
+        rng = np.random.default_rng([self._seed, current_depth, int(indices[0])])
+        return np.sort(rng.choice(num_features, num_selected, replace=False))
+    """
+    Function that finds the best split of one feature in a node. The samples with a missing value are left out of the sweep
+    and their class counts are added to either side by score_splits.
+
+    Parameters:
+    - feature_index: The index of the feature
+    - indices: Index array of the training samples in the node
+    - labels: The encoded labels of the samples in the node
+    - parent_counts: The number of samples of every class in the node
+
+    Returns:
+    - The best gain ratio and split of the feature, or 0 and None when no split is valid
+    """
+    def best_feature_split(self, feature_index, indices, labels, parent_counts):
+        num_classes = len(self.classes_)
+        feature_values = self._columns[feature_index][indices]
+        missing = self.missing_mask(feature_values, feature_index)
+        missing_counts = np.zeros(num_classes, dtype=np.int64)
+        if missing.any():
+            missing_counts = np.bincount(labels[missing], minlength=num_classes)
+            feature_values, labels = feature_values[~missing], labels[~missing]
+        if feature_index in self._num_categories:
+            category_counts = np.bincount(feature_values * num_classes + labels, minlength=self._num_categories[feature_index] * num_classes)
+            return self.best_categorical_split(category_counts.reshape(-1, num_classes), missing_counts, parent_counts)
+
+        order = np.argsort(feature_values, kind="stable")
+        sorted_values = feature_values[order]
+        # Class counts of the samples up to and including every position of the sorted column
+        cumulative_counts = np.cumsum(np.eye(num_classes, dtype=np.int64)[labels[order]], axis=0)
+        # A threshold ends at the last position of every unique value, the maximum would leave the right side empty
+        ends = np.flatnonzero(sorted_values[:-1] != sorted_values[1:])
+        gain_ratio, best, missing_left = self.score_splits(cumulative_counts[ends], missing_counts, parent_counts)
+        if best is None:
+            return 0, None
+        return gain_ratio, (sorted_values[ends[best]], None, missing_left)
+    """
+    Function that finds the best split of a categorical feature from the class counts of its categories. With two classes the
+    categories are ordered on the proportion of the second class and only the splits between consecutive categories are scored.
+    With more classes every subset is scored when there are at most MAX_EXHAUSTIVE_CATEGORIES categories, and otherwise
+    the orderings on the proportion of every class. Categories that do not occur in the node go the same way as missing values.
+
+    Parameters:
+    - category_counts: Array of shape (categories, classes) with the class counts of every category in the node
+    - missing_counts: The class counts of the samples in the node with a missing value
+    - parent_counts: The number of samples of every class in the node
+
+    Returns:
+    - The best gain ratio and split of the feature, or 0 and None when no split is valid
+    """
+    def best_categorical_split(self, category_counts, missing_counts, parent_counts):
+        category_totals = category_counts.sum(axis=1)
+        present = np.flatnonzero(category_totals)
+        if len(present) < 2:
+            return 0, None
+        counts = category_counts[present]
+        num_classes = counts.shape[1]
+
+        best_gain_ratio, best_members, best_missing_left = 0, None, None
+        if num_classes > 2 and len(present) <= self.MAX_EXHAUSTIVE_CATEGORIES:
+            # The first category is always on the left, so every split is scored once
+            masks = np.arange(2 ** (len(present) - 1) - 1)
+            members = np.ones((len(masks), len(present)), dtype=bool)
+            members[:, 1:] = (masks[:, np.newaxis] >> np.arange(len(present) - 1)) & 1
+            gain_ratio, best, missing_left = self.score_splits(members.astype(np.int64) @ counts, missing_counts, parent_counts)
+            if best is not None:
+                best_gain_ratio, best_members, best_missing_left = gain_ratio, members[best], missing_left
+        else:
+            proportions = counts / category_totals[present, np.newaxis]
+            for class_index in (range(num_classes) if num_classes > 2 else [num_classes - 1]):
+                order = np.argsort(proportions[:, class_index], kind="stable")
+                gain_ratio, best, missing_left = self.score_splits(np.cumsum(counts[order], axis=0)[:-1], missing_counts, parent_counts)
+                if best is not None and gain_ratio > best_gain_ratio:
+                    best_gain_ratio, best_missing_left = gain_ratio, missing_left
+                    best_members = np.zeros(len(present), dtype=bool)
+                    best_members[order[:best + 1]] = True
+        if best_members is None:
+            return 0, None
+
+        goes_left = np.full(len(category_counts), best_missing_left)
+        goes_left[present] = best_members
+        return best_gain_ratio, (None, np.flatnonzero(goes_left), best_missing_left)
+    """
+    Function that scores candidate splits of a node given the class counts of their left side without the missing values.
+    When the node has missing values, every candidate is also scored with them on the left, which is how the side they go to is learned.
+
+    Parameters:
+    - left_counts: Array with one row per candidate split holding the class counts on the left side, without missing values
+    - missing_counts: The class counts of the samples with a missing value, one row for all candidates or one per candidate
+    - parent_counts: The number of samples of every class in the node
+    - valid: Optional boolean mask of the candidates that may be chosen
+
+    Returns:
+    - The best gain ratio, the index of its candidate and whether missing values go left. The index is None when no candidate
+      has a positive gain ratio. Without missing values in the node, they go to the larger side
+    """
+    def score_splits(self, left_counts, missing_counts, parent_counts, valid=None):
+        variants = [(left_counts, False)]
+        if missing_counts.any():
+            variants.append((left_counts + missing_counts, True))
+
+        best_gain_ratio, best, best_missing_left = 0, None, None
+        num_total = parent_counts.sum()
+        for counts, missing_left in variants:
+            num_left = counts.sum(axis=1)
+            num_right = num_total - num_left
+            candidates = (num_left >= self.min_samples_split) & (num_right >= self.min_samples_split)
+            if valid is not None:
+                candidates &= valid
+            candidates = np.flatnonzero(candidates)
+            if self._profiler is not None:
+                self._profiler.scored.append(len(candidates))
+            if not candidates.size:
+                continue
+            gain_ratios = self.split_gain_ratios(counts[candidates], parent_counts)
+            position = np.argmax(gain_ratios)
+            if gain_ratios[position] > best_gain_ratio:
+                best_gain_ratio, best = gain_ratios[position], candidates[position]
+                best_missing_left = missing_left if len(variants) > 1 else bool(num_left[best] >= num_right[best])
+        return best_gain_ratio, best, best_missing_left
+    """
+    Function that finds the samples with a missing value of a feature. In max_bins mode they are in the extra bin max_bins,
+    a categorical feature has code -1 for them, and a numeric feature has NaN.
+
+    Parameters:
+    - feature_values: The (binned) values of the feature for some samples
+    - feature_index: The index of the feature
+
+    Returns:
+    - Boolean array that is set for the missing values
+    """
+    def missing_mask(self, feature_values, feature_index):
+        if self.max_bins is not None:
+            return feature_values == self.max_bins
+        if feature_index in self._num_categories:
+            return feature_values < 0
+        if feature_values.dtype.kind == "f":
+            return np.isnan(feature_values)
+        return np.zeros(len(feature_values), dtype=bool)
+    """
+    Function that quantizes every feature into at most max_bins bins. When a feature has few enough distinct values every value
+    gets its own bin, otherwise the bin edges are quantiles of the column. The thresholds are the upper edges of the bins,
+    so a value is at most the threshold of bin b exactly when its bin is at most b. A categorical feature uses its category
+    codes as bins and has no thresholds. Missing values go to the extra bin max_bins, which is why max_bins is at most 255:
+the bins and the missing bin then fit the uint8 matrix.
+
+    Parameters:
+    - columns: The feature columns of the training data
+    """
+    def fit_bins(self, columns):
+        if not 2 <= self.max_bins <= 255:
+            raise Exception("max_bins must be between 2 and 255")
+        self._bin_thresholds = []
+        self._binned = np.empty((len(self._labels), len(columns)), dtype=np.uint8)
+        for feature_index, column in enumerate(columns):
+            missing = None
+            if feature_index in self._num_categories:
+                missing = column < 0
+            elif column.dtype.kind == "f":
+                missing = np.isnan(column)
+            if feature_index in self._num_categories:
+                if self._num_categories[feature_index] > self.max_bins:
+                    raise Exception(f"Feature {feature_index} has {self._num_categories[feature_index]} categories, max_bins must be at least as large")
+                self._bin_thresholds.append(np.empty(0))
+                self._binned[:, feature_index] = np.where(missing, self.max_bins, column)
+                continue
+            known = column if missing is None else column[~missing]
+            thresholds = np.unique(known)[:-1]
+            if len(thresholds) >= self.max_bins:
+                quantiles = np.linspace(0, 1, self.max_bins + 1)[1:-1]
+                thresholds = np.unique(np.quantile(known, quantiles, method="lower"))
+            self._bin_thresholds.append(thresholds)
+            self._binned[:, feature_index] = np.searchsorted(thresholds, column, side="left")
+            if missing is not None:
+                self._binned[missing, feature_index] = self.max_bins
+    """
+    Function that counts the samples of every class per feature and bin
+
+    Parameters:
+    - indices: Index array of the training samples in the node
+
+    Returns:
+    - Array of shape (features, max_bins + 1, classes) with the class counts, the last bin holds the missing values
+    """
+    def bin_histogram(self, indices):
+        num_features = self._binned.shape[1]
+        num_classes = len(self.classes_)
+        bins = self._binned[indices].astype(np.intp) + np.arange(num_features) * (self.max_bins + 1)
+        flat = bins * num_classes + self._labels[indices, np.newaxis]
+        histogram = np.bincount(flat.ravel(), minlength=num_features * (self.max_bins + 1) * num_classes)
+        return histogram.reshape(num_features, self.max_bins + 1, num_classes)
+    """
+    Function that finds the split with the highest gain ratio from the histogram of a node. The left class counts of every
+    bin boundary of every numeric feature come from a cumulative sum over the bins, so all those candidate splits are scored at once.
+    The categorical features are searched one by one from the counts of their bins.
+
+    Parameters:
+    - histogram: The class counts per feature and bin of the node
+    - parent_counts: The number of samples of every class in the node
+    - features: The feature indices to consider, all of them if None
+
+    Returns:
+    - The best gain ratio, feature index and split, a tuple of (bin, left categories, missing_left) with one of the first two None.
+      The feature index is None when no split improves on a gain ratio of 0
+    """
+    def find_best_binned_split(self, histogram, parent_counts, features=None):
+        num_features = histogram.shape[0]
+        num_classes = histogram.shape[2]
+        selected = np.ones(num_features, dtype=bool)
+        if features is not None:
+            selected[:] = False
+            selected[features] = True
+        # Splitting after the last bin would leave the right side empty
+        left_counts = np.cumsum(histogram[:, :self.max_bins], axis=1)[:, :-1].reshape(-1, num_classes)
+        missing_counts = np.repeat(histogram[:, self.max_bins], self.max_bins - 1, axis=0)
+        num_bins = np.array([len(thresholds) for thresholds in self._bin_thresholds])
+        within_feature = (np.arange(self.max_bins - 1) < num_bins[:, np.newaxis]) & selected[:, np.newaxis]
+
+        best_gain_ratio, best_feature, best_split = 0, None, None
+        gain_ratio, best, missing_left = self.score_splits(left_counts, missing_counts, parent_counts, within_feature.ravel())
+        if best is not None:
+            feature_index, best_bin = divmod(int(best), self.max_bins - 1)
+            best_gain_ratio, best_feature, best_split = gain_ratio, feature_index, (best_bin, None, missing_left)
+        for feature_index in sorted(self._num_categories):
+            if not selected[feature_index]:
+                continue
+            num_categories = self._num_categories[feature_index]
+            gain_ratio, split = self.best_categorical_split(histogram[feature_index, :num_categories], histogram[feature_index, self.max_bins], parent_counts)
+            # Ties go to the lowest feature index, like in find_best_split
+            if gain_ratio > best_gain_ratio or (gain_ratio == best_gain_ratio and split is not None and feature_index < best_feature):
+                best_gain_ratio, best_feature, best_split = gain_ratio, feature_index, split
+        return best_gain_ratio, best_feature, best_split
+    """
+    Function that calculates the gain ratio of many candidate splits of the same node at once
+
+    Parameters:
+    - left_counts: Array with one row per candidate split holding the number of samples of every class on the left side
+    - parent_counts: The number of samples of every class in the node
+
+    Returns:
+    - Array with the gain ratio of every candidate split
+    """
+    def split_gain_ratios(self, left_counts, parent_counts):
+        right_counts = parent_counts - left_counts
+        num_total = parent_counts.sum()
+        num_left = left_counts.sum(axis=1)
+        num_right = num_total - num_left
+
+        info = self.entropy_from_counts(parent_counts[np.newaxis, :])
+        info_A = (num_left / num_total) * self.entropy_from_counts(left_counts) + (num_right / num_total) * self.entropy_from_counts(right_counts)
+        info_gain = info - info_A
+
+        split_info = np.zeros(len(left_counts))
+        for num_subset in (num_left, num_right):
+            proportion = num_subset / num_total
+            split_info -= proportion * np.log2(proportion, out=np.zeros_like(proportion), where=proportion > 0)
+        return np.divide(info_gain, split_info, out=np.zeros_like(info_gain), where=split_info != 0)
+    """
+    Function that calculates the entropy of many label distributions at once, in the same order of operations as entropy
+
+    Parameters:
+    - counts: Array with one row of class counts per distribution
+
+    Returns:
+    - Array with the entropy of every row
+    """
+    def entropy_from_counts(self, counts):
+        num_labels = counts.sum(axis=1)
+        entropy = np.zeros(len(counts))
+        for class_counts in counts.T:
+            probability = np.divide(class_counts, num_labels, out=np.zeros(len(counts)), where=class_counts > 0)
+            entropy -= probability * np.log2(probability, out=np.zeros_like(probability), where=probability > 0)
+        return entropy
+    """
+    Function that picks the value of a leaf, the most common class (the smallest one on ties, like pandas mode)
 
-        left_tree = self.build_tree(best_subsets[0], current_depth + 1)
-        right_tree = self.build_tree(best_subsets[1], current_depth + 1)
+    Parameters:
+    - counts: The number of samples of every class in the leaf
 
-        return Node(feature_index=best_feature, threshold=best_threshold, left=left_tree, right=right_tree, info_gain=best_gain_ratio)
+    Returns:
+    - The class label of the leaf
+    """
+    def leaf_value(self, counts):
+        return self.classes_[np.argmax(counts)]
     """
     Function that calculates entropy
 
@@ -161,6 +756,128 @@ class DecisionTreeClassifier:
         gain_ratio = info_gain / info_A if info_A != 0 else 0
         return gain_ratio
 
+    """
+    Function that lists the nodes of the tree breadth first, so every node comes before its children
+
+    Returns:
+    - The list of nodes, starting with the root
+    """
+    def breadth_first_nodes(self):
+        nodes = [self.root]
+        for node in nodes:
+            if node.value is None:
+                nodes.append(node.left)
+                nodes.append(node.right)
+        return nodes
+    """
+    Function that prunes the tree with the pessimistic error estimate of C4.5. The estimated errors of a node as a leaf are
+    its training errors plus added_errors, and the estimated errors of a subtree are the sum over its leaves. Going through
+    the nodes in reverse breadth first order visits every child before its parent, so one pass over the stored class counts
+    decides every node: it becomes a leaf when that does not increase the estimate by more than 0.1 errors. The compiled
+    arrays are rebuilt afterwards.
+
+    Parameters:
+    - confidence: The confidence level of the upper error limit, lower values prune more
+    """
+    def prune(self, confidence=0.25):
+        if self.root is None:
+            raise Exception("Only a tree fitted in this process can be pruned")
+        nodes = self.breadth_first_nodes()
+        node_ids = {id(node): node_id for node_id, node in enumerate(nodes)}
+        counts = np.array([node.counts for node in nodes])
+        num_samples = counts.sum(axis=1)
+        errors = num_samples - counts.max(axis=1)
+        leaf_estimates = errors + self.added_errors(num_samples, errors, confidence)
+
+        estimates = leaf_estimates.copy()
+        for node_id in range(len(nodes) - 1, -1, -1):
+            node = nodes[node_id]
+            if node.value is not None:
+                continue
+            subtree_estimate = estimates[node_ids[id(node.left)]] + estimates[node_ids[id(node.right)]]
+            if leaf_estimates[node_id] <= subtree_estimate + 0.1:
+                nodes[node_id] = Node(value=self.leaf_value(node.counts), counts=node.counts)
+            else:
+                estimates[node_id] = subtree_estimate
+                node.left = nodes[node_ids[id(node.left)]]
+                node.right = nodes[node_ids[id(node.right)]]
+        self.root = nodes[0]
+        self.compile_tree()
+    """
+    Function that calculates how many errors have to be added to the training errors of leaves to get the upper limit of the
+    binomial confidence interval, with the same approximations as C4.5
+
+    Parameters:
+    - num_samples: Array with the number of training samples of every leaf
+    - errors: Array with the number of misclassified training samples of every leaf
+    - confidence: The confidence level of the upper limit
+
+    Returns:
+    - Array with the number of added errors of every leaf
+    """
+    def added_errors(self, num_samples, errors, confidence):
+        num_samples = np.maximum(num_samples, 1).astype(np.float64)
+        errors = errors.astype(np.float64)
+        z = NormalDist().inv_cdf(1 - confidence)
+
+        def normal_approximation(errors):
+            errors = errors + 0.5
+            spread = np.sqrt(np.maximum(z * z / 4 + errors * (1 - errors / num_samples), 0))
+            return num_samples * (errors + z * z / 2 + z * spread) / (num_samples + z * z) - (errors - 0.5)
+
+        def upper_limit(errors):
+            return np.where(errors + 0.5 >= num_samples, 0.67 * (num_samples - errors), normal_approximation(errors))
+
+        no_errors = num_samples * (1 - confidence ** (1 / num_samples))
+        # Below one error the limit is interpolated between no errors and one error
+        fraction = no_errors + errors * (upper_limit(np.ones_like(errors)) - no_errors)
+        added = np.where(errors < 0.9999, fraction, upper_limit(errors))
+        return np.where(errors < 1e-6, no_errors, added)
+    """
+    Function that compiles the linked Node objects into parallel arrays, stored in tree_arrays. Node i tests
+    feature_index[i] <= threshold[i] and continues at left[i] or right[i]. Leaves have feature_index -1 and
+    value holds the index of their class in classes_. The nodes are numbered breadth first, the root is node 0.
+    A categorical node has a NaN threshold and its row of category_left, one entry per category of the feature, starts at
+    category_offset[i] (-1 for the other nodes). missing_left[i] is the side that missing values go to.
+    """
+    def compile_tree(self):
+        nodes = self.breadth_first_nodes()
+        node_ids = {id(node): node_id for node_id, node in enumerate(nodes)}
+        class_ids = {label: class_id for class_id, label in enumerate(self.classes_)}
+        category_offset = np.full(len(nodes), -1, dtype=np.int64)
+        category_rows = []
+        num_entries = 0
+        for node_id, node in enumerate(nodes):
+            if node.value is None and node.categories is not None:
+                row = np.zeros(self._num_categories[node.feature_index], dtype=bool)
+                row[node.categories] = True
+                category_offset[node_id] = num_entries
+                category_rows.append(row)
+                num_entries += len(row)
+
+        self.tree_arrays = {
+            "feature_index": np.array([-1 if node.value is not None else node.feature_index for node in nodes], dtype=np.int64),
+            "threshold": np.array([np.nan if node.value is not None or node.categories is not None else node.threshold for node in nodes], dtype=np.float64),
+            "left": np.array([-1 if node.value is not None else node_ids[id(node.left)] for node in nodes], dtype=np.int64),
+            "right": np.array([-1 if node.value is not None else node_ids[id(node.right)] for node in nodes], dtype=np.int64),
+            "value": np.array([class_ids[node.value] if node.value is not None else -1 for node in nodes], dtype=np.int64),
+            "missing_left": np.array([node.value is None and node.missing_left for node in nodes], dtype=bool),
+            "category_offset": category_offset,
+            "category_left": np.concatenate(category_rows) if category_rows else np.zeros(0, dtype=bool),
+        }
+    """
+    Function that routes many rows through the compiled tree at once. All the rows that have not reached a leaf
+    take one step down per iteration, so the number of iterations is the depth of the tree.
+
+    Parameters:
+    - values: 2D array with the encoded feature values of the rows, see encode_features
+
+    Returns:
+    - Array with the leaf node id reached by every row
+    """
+    def apply(self, values):
+        return route_rows(self.tree_arrays, values, np.zeros(len(values), dtype=np.int64), np.arange(len(values)))
+
     def predict(self, X):
         """
         Predicts the target values for the input data
@@ -169,19 +886,71 @@ class DecisionTreeClassifier:
         - X: The input data containing features.
 
         Returns:
-        - A list of predicted target values corresponding to each row in X
+        - An array of predicted target values corresponding to each row in X
         """
-        predictions = []
-        for _, row in X.iterrows():
-            node = self.root
-            while node.value is None:
-                feature_value = row.iloc[node.feature_index]
-                if feature_value <= node.threshold:
-                    node = node.left
-                else:
-                    node = node.right
-            predictions.append(node.value)
-        return predictions
+        values = encode_features(X, self.num_features, self.categories_)
+        leaves = self.apply(values)
+        return self.classes_[self.tree_arrays["value"][leaves]]
+    """
+    Function that saves the compiled tree to a single binary file. The file starts with MODEL_MAGIC and the length of a JSON header,
+    which holds the class labels, the categories of the categorical features and the dtype, offset and length of every array of tree_arrays. The arrays follow as raw data,
+    every one aligned to MODEL_ALIGNMENT bytes so load can memory-map it in place.
+
+    Parameters:
+    - path: The file that will store the model
+    """
+    def save(self, path):
+        arrays = {}
+        offset = 0
+        for name, array in self.tree_arrays.items():
+            if array.dtype.hasobject:
+                raise Exception(f"The {name} array of the tree is not numeric and can not be saved")
+            arrays[name] = [array.dtype.str, offset, len(array)]
+            offset += -(-array.nbytes // self.MODEL_ALIGNMENT) * self.MODEL_ALIGNMENT
+        categories = {feature_index: labels.tolist() for feature_index, labels in self.categories_.items()}
+        header = json.dumps({"num_features": self.num_features, "classes": self.classes_.tolist(), "categories": categories, "arrays": arrays}).encode()
+        # The arrays start at the first aligned position after the magic, the header length and the header
+        data_start = -(-(len(self.MODEL_MAGIC) + 8 + len(header)) // self.MODEL_ALIGNMENT) * self.MODEL_ALIGNMENT
+
+        with open(path, "wb") as file:
+            file.write(self.MODEL_MAGIC)
+            file.write(len(header).to_bytes(8, "little"))
+            file.write(header)
+            for name, array in self.tree_arrays.items():
+                file.seek(data_start + arrays[name][1])
+                file.write(np.ascontiguousarray(array).tobytes())
+            file.truncate(data_start + offset)
+    """
+    Function that loads a model written by save. The arrays are memory-mapped read-only instead of read, so loading does not
+    depend on the size of the tree and processes that load the same file share its pages through the page cache.
+
+    Parameters:
+    - path: The file storing the model
+
+    Returns:
+    - A DecisionTreeClassifier that can predict but not be refitted from the file
+    """
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as file:
+            if file.read(len(cls.MODEL_MAGIC)) != cls.MODEL_MAGIC:
+                raise Exception(f"{path} is not a saved DecisionTreeClassifier model")
+            header_length = int.from_bytes(file.read(8), "little")
+            header = json.loads(file.read(header_length))
+        data_start = -(-(len(cls.MODEL_MAGIC) + 8 + header_length) // cls.MODEL_ALIGNMENT) * cls.MODEL_ALIGNMENT
+
+        tree = cls()
+        tree.num_features = header["num_features"]
+        tree.classes_ = np.array(header["classes"])
+        tree.categories_ = {int(feature_index): np.array(labels) for feature_index, labels in header["categories"].items()}
+        tree._num_categories = {feature_index: len(labels) for feature_index, labels in tree.categories_.items()}
+        tree.tree_arrays = {}
+        for name, (dtype, offset, length) in header["arrays"].items():
+            if length == 0:
+                tree.tree_arrays[name] = np.empty(0, dtype=dtype)
+            else:
+                tree.tree_arrays[name] = np.memmap(path, dtype=dtype, mode="r", offset=data_start + offset, shape=(length,))
+        return tree
     """
     Function that is responsiple for fitting the classifier to  the data
 
@@ -190,22 +959,168 @@ class DecisionTreeClassifier:
     - Y: The target values of the shape n_samples that represnet the target labels of the training samples
     """
     def fit(self, X, Y):
-        data = pd.concat([X, Y], axis=1)
-        self.root = self.build_tree(data)
+        fit_start = time.perf_counter()
+        self._profiler = TrainingProfiler() if self.profile else None
+        self.classes_, self._labels = np.unique(np.asarray(Y), return_inverse=True)
+        self.num_features = X.shape[1]
+        self._seed = self.random_state if self.random_state is not None else np.random.SeedSequence().entropy
+        # Categorical features are trained on the codes of their categories, with -1 for a missing value
+        self.categories_ = find_categories(X)
+        self._num_categories = {feature_index: len(labels) for feature_index, labels in self.categories_.items()}
+        self._columns = []
+        for feature_index in range(X.shape[1]):
+            column = X.iloc[:, feature_index]
+            if feature_index in self.categories_:
+                self._columns.append(category_codes(column, self.categories_[feature_index]).astype(np.int64))
+            elif isinstance(column.dtype, np.dtype):
+                self._columns.append(column.to_numpy())
+            else:
+                # Nullable extension types hold pd.NA for a missing value
+                self._columns.append(column.to_numpy(dtype=np.float64, na_value=np.nan))
+        if self.max_bins is not None:
+            self.fit_bins(self._columns)
+        build_start = time.perf_counter()
+        if self.n_jobs > 1:
+            self.parallel_fit()
+        else:
+            self.root = self.build_tree(np.arange(len(X)))
+        compile_start = time.perf_counter()
+        del self._columns, self._labels
+        if self.max_bins is not None:
+            del self._binned
+        if self.pruning_confidence is not None:
+            self.prune(self.pruning_confidence)
+        else:
+            self.compile_tree()
 
+        if self._profiler is not None:
+            fit_end = time.perf_counter()
+            self._profiler.timings = {"prepare": build_start - fit_start, "build": compile_start - build_start,
+                                      "compile": fit_end - compile_start, "fit": fit_end - fit_start}
+            # The profile is kept for inspection after fit, without the collecting hook
+            self.profile_ = self._profiler
+            self._profiler = None
 
-if __name__ == "__main__":
-    train_filename = sys.argv[1]
-    test_filename = sys.argv[2]
-    output_filename = sys.argv[3]
+    """
+    Function that builds the tree with n_jobs processes. The training arrays are written once to .npy files in a temporary
+    directory, which the workers memory-map instead of receiving a pickled copy with every subtree. The nodes above
+    parallel_depth are built here (evaluating their features on threads when they are large), and every subtree starting
+    at parallel_depth is built by a worker. The result is the same tree as a serial fit.
+    """
+    def parallel_fit(self):
+        with tempfile.TemporaryDirectory() as directory:
+            np.save(os.path.join(directory, "labels.npy"), self._labels)
+            for feature_index, column in enumerate(self._columns):
+                np.save(os.path.join(directory, f"column_{feature_index}.npy"), column)
+            if self.max_bins is not None:
+                np.save(os.path.join(directory, "binned.npy"), self._binned)
+
+            self._shared_directory = directory
+            self._process_pool = ProcessPoolExecutor(self.n_jobs)
+            self._thread_pool = ThreadPoolExecutor(self.n_jobs)
+            try:
+                self.root = self.resolve_subtrees(self.build_tree(np.arange(len(self._labels))))
+            finally:
+                self._process_pool.shutdown()
+                self._thread_pool.shutdown()
+                self._process_pool = self._thread_pool = None
+    """
+    Function that replaces the PendingSubtree placeholders of a tree by the subtrees built by the workers
+
+    Parameters:
+    - node: The root of the (sub)tree
 
-    train_data = file_reader(train_filename)
-    test_data = file_reader(test_filename)
+    Returns:
+    - The root of the complete (sub)tree
+    """
+    def resolve_subtrees(self, node):
+        if isinstance(node, PendingSubtree):
+            subtree, records = node.future.result()
+            if self._profiler is not None:
+                self._profiler.nodes.extend(records)
+            return subtree
+        if node.value is None:
+            node.left = self.resolve_subtrees(node.left)
+            node.right = self.resolve_subtrees(node.right)
+        return node
+    """
+    Function that collects what a worker needs, besides the shared arrays, to build subtrees like this classifier
+
+    Returns:
+    - A dict with the parameters and the fitted label and bin information
+    """
+    def get_params(self):
+        params = {"min_samples_split": self.min_samples_split, "max_depth": self.max_depth, "max_bins": self.max_bins,
+                  "max_features": self.max_features, "seed": self._seed, "classes": self.classes_, "num_features": self.num_features,
+                  "num_categories": self._num_categories, "profile": self._profiler is not None}
+        if self.max_bins is not None:
+            params["bin_thresholds"] = self._bin_thresholds
+        return params
+
+# The classifier of a pool worker, loaded once per shared training directory
+_worker_tree = None
+
+def _build_subtree(directory, params, indices, current_depth):
+    global _worker_tree
+    if _worker_tree is None or _worker_tree._shared_directory != directory:
+        tree = DecisionTreeClassifier(params["min_samples_split"], params["max_depth"], params["max_bins"], max_features=params["max_features"])
+        tree.classes_ = params["classes"]
+        tree.num_features = params["num_features"]
+        tree._num_categories = params["num_categories"]
+        tree._seed = params["seed"]
+        tree._shared_directory = directory
+        tree._labels = np.load(os.path.join(directory, "labels.npy"), mmap_mode="r")
+        tree._columns = []
+        for feature_index in range(params["num_features"]):
+            path = os.path.join(directory, f"column_{feature_index}.npy")
+            tree._columns.append(np.load(path, mmap_mode="r"))
+        if params["max_bins"] is not None:
+            tree._bin_thresholds = params["bin_thresholds"]
+            tree._binned = np.load(os.path.join(directory, "binned.npy"), mmap_mode="r")
+        _worker_tree = tree
+    # The records of the subtree go back with it, for the profiler of the main process
+    _worker_tree._profiler = TrainingProfiler() if params["profile"] else None
+    subtree = _worker_tree.build_tree(indices, current_depth)
+    return subtree, _worker_tree._profiler.nodes if params["profile"] else None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(usage="[program] <train_file> <test_file> <output_file> [--save-model MODEL]\n"
+                                           "       [program] --model MODEL <test_file> <output_file>")
+    parser.add_argument("files", nargs="+", help="train_file test_file output_file, or test_file output_file with --model")
+    parser.add_argument("--model", help="predict with a model written by --save-model instead of training")
+    parser.add_argument("--save-model", help="save the trained model to this file")
+    parser.add_argument("--max-depth", type=int, default=5, help="the maximum depth of the trained tree")
+    parser.add_argument("--profile", action="store_true", help="print where the training time went to stderr")
+    parser.add_argument("--profile-json", help="write the training profile with every node to this JSON file")
+    parser.add_argument("--prune", type=float, metavar="CONFIDENCE", help="prune the trained tree with C4.5 pessimistic error pruning, 0.25 is the C4.5 default")
+    parser.add_argument("--chunksize", type=int, help="read and predict the test file in chunks of this many rows")
+    parser.add_argument("--pipeline", action="store_true", help="with --chunksize, read and write chunks on threads while predicting")
+    args = parser.parse_args()
+    if len(args.files) != (2 if args.model else 3):
+        parser.error("expected test_file and output_file with --model, train_file test_file output_file otherwise")
 
-    tree = DecisionTreeClassifier(max_depth=5, min_samples_split=2)
-    tree.fit(train_data.iloc[:, :-1], train_data.iloc[:, -1])
-    predictions = tree.predict(test_data)
+    if args.model:
+        if args.save_model:
+            parser.error("--save-model can not be combined with --model")
+        test_filename, output_filename = args.files
+        tree = DecisionTreeClassifier.load(args.model)
+    else:
+        train_filename, test_filename, output_filename = args.files
+        train_data = file_reader(train_filename)
+        tree = DecisionTreeClassifier(max_depth=args.max_depth, min_samples_split=2, pruning_confidence=args.prune,
+                                      profile=args.profile or args.profile_json is not None)
+        tree.fit(train_data.iloc[:, :-1], train_data.iloc[:, -1])
+        if args.profile:
+            print(tree.profile_.summary(), file=sys.stderr)
+        if args.profile_json:
+            tree.profile_.save_json(args.profile_json)
+        if args.save_model:
+            tree.save(args.save_model)
 
-    result_data = test_data.copy()
-    result_data['predicted'] = predictions
-    file_writer(result_data, output_filename)
+    if args.chunksize:
+        stream_predict(tree, test_filename, output_filename, args.chunksize, args.pipeline)
+    else:
+        test_data = file_reader(test_filename)
+        test_data['predicted'] = tree.predict(test_data)
+        file_writer(test_data, output_filename)
@@ -0,0 +1,107 @@
+"""
+FP-Growth implementation that can be used instead of the apriori function in Apriori.py. The transactions are compressed into
+an FP-tree and the frequent itemsets are mined from conditional pattern bases, so the transactions are not rescanned for every level.
+"""
+
+"""
+Node class for the nodes of the FP-tree. Every node knows its parent so prefix paths can be followed upwards, and the nodes
+holding the same item are chained together through link (the header table linked list).
+"""
+class FPNode:
+    def __init__(self, item=None, count=0, parent=None):
+        self.item = item
+        self.count = count
+        self.parent = parent
+        self.children = {}
+        self.link = None
+
+"""
+This function builds an FP-tree from weighted transactions. The items of every transaction are filtered on min_support_count
+and inserted in descending order of their support, so transactions sharing frequent items share the same prefix path.
+
+Parameters:
+- weighted_transactions (list[tuple]): Pairs of (items, count). A plain transaction has count 1
+- min_support_count (float): The minimum number of transactions an item has to occur in
+
+Returns:
+- The root of the FP-tree and the header table, a dict mapping every frequent item to [support count, first node, last node]
+"""
+def build_fp_tree(weighted_transactions, min_support_count):
+    item_counts = {}
+    for items, count in weighted_transactions:
+        for item in items:
+            item_counts[item] = item_counts.get(item, 0) + count
+    # Sort on descending support, ties on the item itself so the tree does not depend on set ordering
+    frequent_items = sorted((item for item, count in item_counts.items() if count >= min_support_count),
+                            key=lambda item: (-item_counts[item], item))
+    rank = {item: position for position, item in enumerate(frequent_items)}
+    header = {item: [item_counts[item], None, None] for item in frequent_items}
+
+    root = FPNode()
+    for items, count in weighted_transactions:
+        node = root
+        for item in sorted((item for item in items if item in rank), key=rank.__getitem__):
+            child = node.children.get(item)
+            if child is None:
+                child = node.children[item] = FPNode(item, 0, node)
+                entry = header[item]
+                if entry[1] is None:
+                    entry[1] = child
+                else:
+                    entry[2].link = child
+                entry[2] = child
+            child.count += count
+            node = child
+    return root, header
+
+"""
+This function mines the frequent itemsets from an FP-tree. For every item of the header table, starting with the least frequent one,
+the prefix paths of its nodes form the conditional pattern base, which is turned into a conditional FP-tree and mined recursively.
+
+Parameters:
+- header (dict): The header table of the (conditional) FP-tree
+- suffix (frozenset): The itemset the tree is conditioned on
+- min_support_count (float): The minimum support count
+- support_counts (dict): Filled with the support count of every frequent itemset found
+"""
+def mine_fp_tree(header, suffix, min_support_count, support_counts):
+    for item in sorted(header, key=lambda item: (header[item][0], item)):
+        itemset = suffix | {item}
+        support_counts[itemset] = header[item][0]
+
+        conditional_pattern_base = []
+        node = header[item][1]
+        while node is not None:
+            path = []
+            parent = node.parent
+            while parent.item is not None:
+                path.append(parent.item)
+                parent = parent.parent
+            if path:
+                conditional_pattern_base.append((path, node.count))
+            node = node.link
+
+        _, conditional_header = build_fp_tree(conditional_pattern_base, min_support_count)
+        if conditional_header:
+            mine_fp_tree(conditional_header, itemset, min_support_count, support_counts)
+
+"""
+This function implements the FP-Growth algorithm. It returns the same frequent itemsets as apriori in Apriori.py,
+so its result can be passed to association_rules and write_output unchanged.
+
+Parameters:
+- transactions (list[set]): The list of transactions
+- min_support (float): The minimum support in percent
+- return_counts (bool): Also return the support counts of the frequent itemsets, like apriori(..., return_counts=True)
+
+Returns:
+- All the frequent itemsets [frozenset] found by the FP-Growth algorithm, and a dict with their support counts if return_counts is set
+"""
+def fp_growth(transactions, min_support, return_counts=False):
+    min_support_count = min_support * len(transactions) / 100
+    _, header = build_fp_tree([(transaction, 1) for transaction in transactions], min_support_count)
+    support_counts = {}
+    mine_fp_tree(header, frozenset(), min_support_count, support_counts)
+    if return_counts:
+        return list(support_counts), support_counts
+    return list(support_counts)
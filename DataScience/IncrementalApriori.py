@@ -0,0 +1,201 @@
+import argparse
+import json
+import os
+from Apriori import CandidateTrie, association_rules, file_reader, generate_candidate_itemsets, write_output
+"""
+Incremental version of the apriori algorithm in the spirit of FUP. The frequent itemsets of the previous run, their support counts
+and the negative border (the candidates that were counted but missed the threshold) are kept in a state file. When a new batch
+of transactions arrives, only the batch is scanned for itemsets with a known count. The old transactions are only rescanned for
+candidates that were not counted before and are frequent enough in the batch to become frequent overall. Every batch is copied
+into a history file next to the state file, so a rescan does not depend on the input files still holding the same transactions.
+"""
+
+"""
+This function counts the support of the candidates in one pass over the transactions through a CandidateTrie
+
+Parameters:
+- transactions (list[set]): The list of transactions
+- candidates (set[frozenset]): The candidate itemsets, all of the same size
+
+Returns:
+- A dict mapping every candidate to its support count
+"""
+def count_candidates(transactions, candidates):
+    trie = CandidateTrie(candidates)
+    for transaction in transactions:
+        trie.add_transaction(sorted(transaction))
+    return dict(zip(trie.candidates, trie.counts))
+
+"""
+This function runs the apriori algorithm, but also keeps the negative border, which is needed by update_state
+
+Parameters:
+- transactions (list[set]): The list of transactions
+- min_support (float): The minimum support in percent
+
+Returns:
+- A new state holding the frequent itemsets and the negative border with their support counts
+"""
+def mine_state(transactions, min_support):
+    min_support_count = min_support * len(transactions) / 100
+    frequent, border = {}, {}
+    k = 1
+    candidates = generate_candidate_itemsets(k, set(), transactions)
+    while candidates:
+        level_frequent = set()
+        for candidate, count in count_candidates(transactions, candidates).items():
+            if count >= min_support_count:
+                frequent[candidate] = count
+                level_frequent.add(candidate)
+            else:
+                border[candidate] = count
+        k += 1
+        candidates = generate_candidate_itemsets(k, level_frequent, transactions) if level_frequent else set()
+    return {'min_support': min_support, 'transaction_count': len(transactions), 'frequent': frequent, 'border': border}
+
+"""
+This function updates a state with a new batch of transactions. The candidates are generated level-wise from the updated frequent itemsets.
+A candidate with a known count (frequent or in the border) only needs its count in the batch. A candidate that was never counted
+was infrequent in the old transactions, so it can only become frequent when it is frequent in the batch, and only those are counted
+in the old transactions, which are loaded at most once.
+
+Parameters:
+- state (dict): The state of the previous run, from mine_state or load_state
+- delta_transactions (list[set]): The new batch of transactions
+- load_history (function): Returns the old transactions when a rescan is needed
+
+Returns:
+- The updated state
+"""
+def update_state(state, delta_transactions, load_history):
+    min_support = state['min_support']
+    old_count = state['transaction_count']
+    new_count = old_count + len(delta_transactions)
+    min_support_count = min_support * new_count / 100
+    min_delta_support_count = min_support * len(delta_transactions) / 100
+    known_counts = {**state['frequent'], **state['border']}
+    history = None
+
+    frequent, border = {}, {}
+    k = 1
+    candidates = {itemset for itemset in known_counts if len(itemset) == 1}
+    candidates |= generate_candidate_itemsets(k, set(), delta_transactions)
+    while candidates:
+        delta_counts = count_candidates(delta_transactions, candidates)
+        totals = {}
+        rescan = set()
+        for candidate, delta_count in delta_counts.items():
+            if candidate in known_counts:
+                totals[candidate] = known_counts[candidate] + delta_count
+            elif k == 1:
+                # Every item of the old transactions is a known 1-itemset, so this item is new
+                totals[candidate] = delta_count
+            elif delta_count >= min_delta_support_count:
+                rescan.add(candidate)
+        if rescan:
+            if history is None:
+                history = load_history()
+            for candidate, count in count_candidates(history, rescan).items():
+                totals[candidate] = count + delta_counts[candidate]
+
+        level_frequent = set()
+        for candidate, count in totals.items():
+            if count >= min_support_count:
+                frequent[candidate] = count
+                level_frequent.add(candidate)
+            else:
+                border[candidate] = count
+        k += 1
+        candidates = generate_candidate_itemsets(k, level_frequent, None) if level_frequent else set()
+
+    return {'min_support': min_support, 'transaction_count': new_count, 'frequent': frequent, 'border': border}
+
+"""
+Function that writes a state to a JSON file. The itemsets are stored as sorted lists of items with their support counts.
+
+Parameters:
+- state (dict): The state to be written
+- state_file (str): The file that will store the state
+"""
+def save_state(state, state_file):
+    data = dict(state)
+    for key in ('frequent', 'border'):
+        data[key] = [[sorted(itemset), count] for itemset, count in state[key].items()]
+    with open(state_file, 'w') as file:
+        json.dump(data, file)
+
+"""
+Function that reads a state written by save_state
+
+Parameters:
+- state_file (str): The file storing the state
+
+Returns:
+- The state
+"""
+def load_state(state_file):
+    with open(state_file, 'r') as file:
+        state = json.load(file)
+    for key in ('frequent', 'border'):
+        state[key] = {frozenset(items): count for items, count in state[key]}
+    return state
+
+"""
+Function that copies a batch of transactions to the end of the history file of a state
+
+Parameters:
+- history_file (str): The history file, created when it does not exist
+- input_file (str): The file holding the batch
+"""
+def append_history(history_file, input_file):
+    with open(input_file, 'r') as file:
+        batch = file.read()
+    if batch and not batch.endswith('\n'):
+        batch += '\n'
+    with open(history_file, 'a') as file:
+        file.write(batch)
+
+"""
+Function that reads all the old transactions of a state from its history file. The number of transactions is checked against
+the state, so a history file that is out of step with the state (e.g. when a run was interrupted) is not used silently.
+
+Parameters:
+- history_file (str): The history file written by append_history
+- transaction_count (int): The number of transactions of the state
+
+Returns:
+- A list of all the old transactions
+"""
+def read_history(history_file, transaction_count):
+    if not os.path.exists(history_file):
+        raise Exception(f"The history file {history_file} of the state is missing, rerun without a state file")
+    transactions = file_reader(history_file)
+    if len(transactions) != transaction_count:
+        raise Exception(f"The history file {history_file} holds {len(transactions)} transactions but the state has {transaction_count}, rerun without a state file")
+    return transactions
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(usage="[program] <min_support> <state_file> <input_file> <output_file>")
+    parser.add_argument("min_support", type=float)
+    parser.add_argument("state_file", help="created from input_file on the first run, updated with input_file as the new batch afterwards. "
+                                           "The transactions are kept in state_file.history")
+    parser.add_argument("input_file")
+    parser.add_argument("output_file")
+    args = parser.parse_args()
+
+    history_file = args.state_file + '.history'
+    transactions = file_reader(args.input_file)
+    if os.path.exists(args.state_file):
+        state = load_state(args.state_file)
+        if state['min_support'] != args.min_support:
+            raise Exception(f"The state was built with min_support {state['min_support']}, rerun without a state file to change it")
+        state = update_state(state, transactions, lambda: read_history(history_file, state['transaction_count']))
+    else:
+        state = mine_state(transactions, args.min_support)
+        if os.path.exists(history_file):
+            os.remove(history_file)
+    append_history(history_file, args.input_file)
+    save_state(state, args.state_file)
+
+    rules = association_rules(list(state['frequent']), None, args.min_support, state['frequent'], state['transaction_count'])
+    write_output(rules, args.output_file)
@@ -0,0 +1,160 @@
+import sys
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from DecisionTreeClassifier import DecisionTreeClassifier, encode_features, file_reader, file_writer, find_categories, route_rows
+"""
+RandomForestClassifier class that trains an ensemble of DecisionTreeClassifier trees with the same gain ratio criterion.
+Every tree is fitted on a bootstrap sample and considers a random subset of the features in every node, and the predictions
+are made by majority vote. The fitted trees are packed into one set of node arrays so all of them are walked at once.
+"""
+class RandomForestClassifier:
+    # Number of rows routed through the packed trees at once, which bounds the memory of predict
+    PREDICT_BATCH_SIZE = 65536
+
+    def __init__(self, n_estimators=10, min_samples_split=2, max_depth=5, max_features="sqrt", bootstrap=True, max_bins=None, n_jobs=1, random_state=None):
+        self.n_estimators = n_estimators
+        self.min_samples_split = min_samples_split
+        self.max_depth = max_depth
+        self.max_features = max_features
+        self.bootstrap = bootstrap
+        self.max_bins = max_bins
+        self.n_jobs = n_jobs
+        self.random_state = random_state
+        self.trees = []
+    """
+    Function that fits the trees, in a process pool when n_jobs > 1. The training data is handed to every worker once when
+    it starts, and only the seed of a tree is sent with each task; the bootstrap sample is drawn in the worker.
+
+    Parameters:
+    - X: A feature matrix consisting of n_samples and n_features that represent training samples
+    - Y: The target values of the shape n_samples that represnet the target labels of the training samples
+    """
+    def fit(self, X, Y):
+        self.classes_ = np.unique(np.asarray(Y))
+        self.num_features = X.shape[1]
+        self.categories_ = find_categories(X)
+        seeds = [int(seed.generate_state(1)[0]) for seed in np.random.SeedSequence(self.random_state).spawn(self.n_estimators)]
+        params = {"min_samples_split": self.min_samples_split, "max_depth": self.max_depth, "max_features": self.max_features,
+                  "bootstrap": self.bootstrap, "max_bins": self.max_bins}
+
+        if self.n_jobs > 1:
+            with ProcessPoolExecutor(self.n_jobs, initializer=_set_training_data, initargs=(X, Y)) as executor:
+                self.trees = list(executor.map(_fit_tree, [params] * self.n_estimators, seeds))
+        else:
+            _set_training_data(X, Y)
+            self.trees = [_fit_tree(params, seed) for seed in seeds]
+            _set_training_data(None, None)
+        self.pack_trees()
+    """
+    Function that concatenates the node arrays of all the trees. The child ids are shifted by the offset of their tree,
+    and the leaf values are mapped from the classes of a tree (a bootstrap sample can miss a class) to the classes of the forest.
+    The category rows of categorical nodes are rebuilt over the categories of the forest, a category the tree has not seen
+    goes the same way as a missing value.
+    """
+    def pack_trees(self):
+        arrays = {name: [] for name in ("feature_index", "threshold", "left", "right", "value", "missing_left", "category_offset", "category_left")}
+        roots = []
+        offset = 0
+        category_offset = 0
+        for tree in self.trees:
+            tree_arrays = tree.tree_arrays
+            internal = tree_arrays["feature_index"] >= 0
+            class_ids = np.searchsorted(self.classes_, tree.classes_)
+            arrays["feature_index"].append(tree_arrays["feature_index"])
+            arrays["threshold"].append(tree_arrays["threshold"])
+            arrays["left"].append(np.where(internal, tree_arrays["left"] + offset, -1))
+            arrays["right"].append(np.where(internal, tree_arrays["right"] + offset, -1))
+            arrays["value"].append(np.where(internal, -1, class_ids[tree_arrays["value"]]))
+            arrays["missing_left"].append(tree_arrays["missing_left"])
+
+            node_category_offset = np.full(len(internal), -1, dtype=np.int64)
+            for node_id in np.flatnonzero(tree_arrays["category_offset"] >= 0):
+                feature_index = tree_arrays["feature_index"][node_id]
+                tree_categories, categories = tree.categories_[feature_index], self.categories_[feature_index]
+                start = tree_arrays["category_offset"][node_id]
+                positions = np.minimum(np.searchsorted(tree_categories, categories), len(tree_categories) - 1)
+                seen = tree_categories[positions] == categories
+                row = tree_arrays["category_left"][start + positions]
+                arrays["category_left"].append(np.where(seen, row, tree_arrays["missing_left"][node_id]))
+                node_category_offset[node_id] = category_offset
+                category_offset += len(categories)
+            arrays["category_offset"].append(node_category_offset)
+            roots.append(offset)
+            offset += len(tree_arrays["feature_index"])
+        arrays["category_left"].append(np.zeros(0, dtype=bool))
+        self.forest_arrays = {name: np.concatenate(parts) for name, parts in arrays.items()}
+        self.roots = np.array(roots, dtype=np.int64)
+    """
+    Function that counts the votes of all the trees. Every (tree, row) pair that has not reached a leaf takes one step down
+    per iteration (see route_rows), so a batch of rows goes through all the trees with vectorized operations.
+
+    Parameters:
+    - X: The input data containing features
+
+    Returns:
+    - Array of shape (n_samples, n_classes) with the number of trees voting for every class
+    """
+    def predict_votes(self, X):
+        values = encode_features(X, self.num_features, self.categories_)
+        num_classes = len(self.classes_)
+        votes = np.zeros((len(values), num_classes), dtype=np.int64)
+
+        for start in range(0, len(values), self.PREDICT_BATCH_SIZE):
+            batch = values[start:start + self.PREDICT_BATCH_SIZE]
+            rows = np.tile(np.arange(len(batch)), len(self.roots))
+            node_ids = route_rows(self.forest_arrays, batch, np.repeat(self.roots, len(batch)), rows)
+            leaf_values = self.forest_arrays["value"][node_ids]
+            counts = np.bincount(rows * num_classes + leaf_values, minlength=len(batch) * num_classes)
+            votes[start:start + len(batch)] = counts.reshape(len(batch), num_classes)
+        return votes
+
+    def predict(self, X):
+        """
+        Predicts the target values for the input data by majority vote of the trees (the smallest class on ties)
+
+        Parameters:
+        - X: The input data containing features.
+
+        Returns:
+        - An array of predicted target values corresponding to each row in X
+        """
+        return self.classes_[np.argmax(self.predict_votes(X), axis=1)]
+
+# The training data of a pool worker, set once when the worker starts
+_training_X = None
+_training_Y = None
+
+def _set_training_data(X, Y):
+    global _training_X, _training_Y
+    _training_X, _training_Y = X, Y
+
+def _fit_tree(params, seed):
+    rng = np.random.default_rng(seed)
+    num_samples = len(_training_X)
+    sample = rng.integers(0, num_samples, num_samples) if params["bootstrap"] else np.arange(num_samples)
+    tree = DecisionTreeClassifier(params["min_samples_split"], params["max_depth"], params["max_bins"],
+                                  max_features=params["max_features"], random_state=seed)
+    tree.fit(_training_X.iloc[sample], _training_Y.iloc[sample])
+    # The linked nodes are not needed for prediction, so only the compiled arrays are sent back
+    tree.root = None
+    return tree
+
+
+if __name__ == "__main__":
+    if len(sys.argv) not in (4, 5):
+        raise Exception("Usage: [program] <train_file> <test_file> <output_file> [n_estimators]")
+    train_filename = sys.argv[1]
+    test_filename = sys.argv[2]
+    output_filename = sys.argv[3]
+    n_estimators = int(sys.argv[4]) if len(sys.argv) == 5 else 10
+
+    train_data = file_reader(train_filename)
+    test_data = file_reader(test_filename)
+
+    forest = RandomForestClassifier(n_estimators=n_estimators, max_depth=5, min_samples_split=2)
+    forest.fit(train_data.iloc[:, :-1], train_data.iloc[:, -1])
+    predictions = forest.predict(test_data)
+
+    result_data = test_data.copy()
+    result_data['predicted'] = predictions
+    file_writer(result_data, output_filename)
@@ -1,6 +1,7 @@
 # Practices 6&7. Binary Search Tree Operations
 import sys
 from collections import deque
+from itertools import islice
 BUILD = 'B'
 FIND_MIN = 'm'
 FIND_MAX = 'M'
@@ -10,17 +11,32 @@ DELETE = 'D'
 INORDER = 'N'
 PREORDER = 'R'
 POSTORDER = 'O'
+MERGE = 'U'
+SELECT = 'K'
+RANK = 'A'
+COUNT_RANGE = 'C'
+RANGE = 'G'
+# Number of keys joined into one write by the traversals
+WRITE_BATCH_SIZE = 65536
 
 # Node implementation
+# height is the number of nodes on the longest path down to a leaf, which the balanced mode uses
+# size is the number of nodes in the subtree, which the order statistic queries use
 class TreeNode:
+  # Fixed attributes instead of a per-node __dict__, which takes most of the memory of a node
+  __slots__ = ("key", "left", "right", "height", "size")
   def __init__(self, k, l=None, r=None):
     self.key = k
     self.left = l
     self.right = r
+    self.height = 1
+    self.size = 1
 
 class BinarySearchTree:
-  def __init__(self):
+  # With balanced=True the tree is an AVL tree, insertNode and deleteNode rotate so the height stays O(log n)
+  def __init__(self, balanced=False):
     self.root = None
+    self.balanced = balanced
 
   # Return True if tree is empty; False otherwise
   def isEmpty(self):
@@ -50,19 +66,100 @@ class BinarySearchTree:
     node = TreeNode(arr[mid])
     node.left = self.arrayToBST(arr, l, mid-1)
     node.right = self.arrayToBST(arr, mid+1, r)
+    self._updateNode(node) # O(1)
     return node # O(1)
   
+  """
+  Builds a perfectly balanced tree from sorted unique keys without recursion. Every range of the array is split at its middle
+  like in arrayToBST, but the ranges still to be built are kept on an explicit stack.
+
+  Parameters:
+  keys (list[int]): Sorted keys without duplicates
+
+  Returns:
+  The root node of the constructed tree
+
+  Time complexity: O(n)
+  """
+  def _buildBalanced(self, keys):
+    if not keys:
+      return None
+    nodes = [TreeNode(k) for k in keys]
+    stack = [(0, len(keys) - 1)]
+    while stack:
+      l, r = stack.pop()
+      mid = (l + r) // 2
+      node = nodes[mid]
+      node.size = r - l + 1
+      node.height = node.size.bit_length() # The height of a perfectly balanced subtree of this size
+      if l < mid:
+        node.left = nodes[(l + mid - 1) // 2]
+        stack.append((l, mid - 1))
+      if mid < r:
+        node.right = nodes[(mid + 1 + r) // 2]
+        stack.append((mid + 1, r))
+    return nodes[(len(keys) - 1) // 2]
+
+  """
+  Returns the keys of the tree in sorted order, using an explicit stack instead of recursion
+
+  Time complexity: O(n)
+  """
+  def _inorderKeys(self):
+    keys = []
+    stack = []
+    current = self.root
+    while stack or current is not None:
+      while current is not None:
+        stack.append(current)
+        current = current.left
+      current = stack.pop()
+      keys.append(current.key)
+      current = current.right
+    return keys
+
+  """
+  Replaces the tree by a perfectly balanced tree of the given keys. Unlike arrayToBST the keys do not need to be sorted or unique.
+
+  Parameters:
+  keys (list[int]): The keys, in any order and possibly with duplicates
+
+  Time complexity: O(n log n) for sorting
+  """
+  def bulkLoad(self, keys):
+    self.root = self._buildBalanced(sorted(set(keys)))
+
+  """
+  Adds a batch of keys to the tree. The batch is deduplicated against itself and the tree, sorted, merged with the sorted keys
+  of the tree, and the tree is rebuilt perfectly balanced, which is faster than inserting the keys one by one for large batches.
+
+  Parameters:
+  keys (list[int]): The keys to add, in any order and possibly with duplicates or keys already in the tree
+
+  Time complexity: O(n + m log m) for a tree of n keys and a batch of m keys
+  """
+  def bulkInsert(self, keys):
+    existing = self._inorderKeys()
+    batch = set(keys)
+    batch.difference_update(existing)
+    merged = existing + sorted(batch)
+    merged.sort() # The list consists of two sorted runs, which the sort merges in linear time
+    self.root = self._buildBalanced(merged)
+
   """
   Goes through the trees and looks for the lowest value in the tree
 
+  Parameters:
+  - node: The root of the subtree to search. If None, the whole tree is searched
+
   Returns: Node with the minimum value
 
-  Time complexity: O(n)
+  Time complexity: O(n), O(log n) when balanced
   """
   def findMin(self, node=None):
     if self.root is None: # O(1)
       return None
-    current = node # O(1)
+    current = node if node is not None else self.root # O(1)
     while current.left is not None: # O(n)
       current = current.left
     return current # O(1)
@@ -143,6 +240,160 @@ class BinarySearchTree:
         current = current.right
     return None
       
+  """
+  Does one step of a Morris inorder traversal. Before going into the left subtree of a node, the rightmost node of that subtree
+  (its inorder predecessor) gets a temporary right link back to the node, which is how the traversal gets back up without a stack.
+  The link is removed again when it is followed.
+
+  Parameters:
+  - current: The current node of the traversal
+
+  Returns:
+  - The next node of the traversal, and the node that is visited in this step or None
+
+  Time complexity: O(1) amortized
+  """
+  def _morrisStep(self, current):
+    if current.left is None:
+      return current.right, current
+    predecessor = current.left
+    while predecessor.right is not None and predecessor.right is not current:
+      predecessor = predecessor.right
+    if predecessor.right is None:
+      predecessor.right = current
+      return current.left, None
+    predecessor.right = None
+    return current.right, current
+
+  """
+  Yields the keys visited inorder with a Morris traversal, which needs no stack and no recursion. The tree is temporarily changed
+  until the traversal is finished, so it is only used where the keys are consumed to the end without running other code on the
+  tree, like writeInorder. When the generator is closed early, the traversal is finished without yielding to remove the temporary links.
+
+  Parameters:
+  - node: The starting node for the inorder traversal. If None, the traversal starts from the root of the tree.
+
+  Returns:
+  - A generator of the keys in sorted order
+
+  Time complexity: O(n)
+  """
+  def _morrisInorder(self, node=None):
+    current = node if node is not None else self.root
+    try:
+      # The steps of _morrisStep, inlined because this loop runs for every node
+      while current is not None:
+        left = current.left
+        if left is None:
+          key = current.key
+          current = current.right
+          yield key
+          continue
+        predecessor = left
+        while predecessor.right is not None and predecessor.right is not current:
+          predecessor = predecessor.right
+        if predecessor.right is None:
+          predecessor.right = current
+          current = left
+        else:
+          predecessor.right = None
+          key = current.key
+          current = current.right
+          yield key
+    finally:
+      while current is not None:
+        current, _ = self._morrisStep(current)
+
+  """
+  Yields the keys visited inorder, with an explicit stack instead of recursion. The tree is not changed, so the caller can stop
+  between keys and use the tree or other traversals in the meantime.
+
+  Parameters:
+  - node: The starting node for the inorder traversal. If None, the traversal starts from the root of the tree.
+
+  Returns:
+  - A generator of the keys in sorted order
+
+  Time complexity: O(n), with O(h) memory for the stack
+  """
+  def inorder(self, node=None):
+    stack = []
+    current = node if node is not None else self.root
+    while stack or current is not None:
+      while current is not None:
+        stack.append(current)
+        current = current.left
+      current = stack.pop()
+      yield current.key
+      current = current.right
+
+  """
+  Yields the keys visited in preorder, with an explicit stack instead of recursion
+
+  Parameters:
+  - node: The starting node for the preorder traversal. If None, the traversal starts from the root of the tree.
+
+  Returns:
+  - A generator of the keys
+
+  Time complexity: O(n)
+  """
+  def preorder(self, node=None):
+    start = node if node is not None else self.root
+    stack = [start] if start is not None else []
+    while stack:
+      current = stack.pop()
+      yield current.key
+      if current.right is not None:
+        stack.append(current.right)
+      if current.left is not None:
+        stack.append(current.left)
+
+  """
+  Yields the keys visited in postorder, with an explicit stack instead of recursion. A node is visited when its right subtree
+  is empty or was the last subtree visited.
+
+  Parameters:
+  - node: The starting node for the postorder traversal. If None, the traversal starts from the root of the tree.
+
+  Returns:
+  - A generator of the keys
+
+  Time complexity: O(n)
+  """
+  def postorder(self, node=None):
+    stack = []
+    current = node if node is not None else self.root
+    last = None
+    while stack or current is not None:
+      while current is not None:
+        stack.append(current)
+        current = current.left
+      top = stack[-1]
+      right = top.right
+      if right is not None and right is not last:
+        current = right
+      else:
+        yield top.key
+        last = stack.pop()
+
+  """
+  Writes keys to a file as "k " per key, joining them in batches so there is one write call per batch instead of per key
+
+  Parameters:
+  - outFile: File to be written to
+  - keys: An iterable of keys
+
+  Time complexity: O(n)
+  """
+  def _writeKeys(self, outFile, keys):
+    keys = iter(keys)
+    while True:
+      batch = list(islice(keys, WRITE_BATCH_SIZE))
+      if not batch:
+        return
+      outFile.write(" ".join(map(str, batch)) + " ")
+
   """
   Given an output file, it writes the keys of all the nodes visited inorder
 
@@ -151,18 +402,11 @@ class BinarySearchTree:
   - Node: The starting node for the inorder traversal. If None, the traversal
   starts from the root of the tree.
 
-  Time complexity: This function uses recursion and is called each time a node is to be written to an output file
-  making the time complexity O(n)
-
+  Time complexity: O(n), with O(1) extra memory for the traversal
   """
   def writeInorder(self, outFile, node=None):
     # Practice 6
-    if node is None: # Base case ... O(1)
-      return # terminate
-    if node is not None: # Recursive case ... O(1)
-      self.writeInorder(outFile, node.left)
-      outFile.write(f"{node.key} ")
-      self.writeInorder(outFile, node.right)
+    self._writeKeys(outFile, self._morrisInorder(node))
 
   # Given an output file, write the keys of all the nodes 
   # visited in preorder traversal
@@ -177,17 +421,7 @@ class BinarySearchTree:
   Time complexity: O(n)
   """
   def writePreorder(self, outFile, node=None):
-    if node is None: # Base case
-      if self.root is None: # O(1)
-        return # Terminate
-      node = self.root
-    outFile.write(f"{node.key} ")
-    if node.left is not None: # O(1)
-      self.writePreorder(outFile, node.left)
-    if node.right is not None: # O(1)
-      self.writePreorder(outFile, node.right)
-
-
+    self._writeKeys(outFile, self.preorder(node))
   
   # Given an output file, write the keys of all the nodes 
   # visited in postorder traversal
@@ -203,89 +437,338 @@ class BinarySearchTree:
   """
   def writePostorder(self, outFile, node=None):
     # Practice 6
-    if node is None: # Base case
-      return # Terminate
-    if node is not None: # Recursive case
-      self.writePostorder(outFile, node.left)
-      self.writePostorder(outFile, node.right)
-      outFile.write(f"{node.key} ")
+    self._writeKeys(outFile, self.postorder(node))
+
+  # Height of a possibly empty subtree
+  def _height(self, node):
+    return node.height if node is not None else 0
+
+  # Number of nodes of a possibly empty subtree
+  def _size(self, node):
+    return node.size if node is not None else 0
+
+  # Recomputes the height and size of node from its children
+  def _updateNode(self, node):
+    node.height = 1 + max(self._height(node.left), self._height(node.right))
+    node.size = 1 + self._size(node.left) + self._size(node.right)
+
+  """
+  Rotates the subtree rooted at node to the right, its left child becomes the root of the subtree
+
+  Parameters:
+  - node: The root of the subtree
+
+  Returns:
+  - The new root of the subtree
+
+  Time complexity: O(1)
+  """
+  def _rotateRight(self, node):
+    child = node.left
+    node.left = child.right
+    child.right = node
+    self._updateNode(node)
+    self._updateNode(child)
+    return child
+
+  """
+  Rotates the subtree rooted at node to the left, its right child becomes the root of the subtree
+
+  Parameters:
+  - node: The root of the subtree
+
+  Returns:
+  - The new root of the subtree
+
+  Time complexity: O(1)
+  """
+  def _rotateLeft(self, node):
+    child = node.right
+    node.right = child.left
+    child.left = node
+    self._updateNode(node)
+    self._updateNode(child)
+    return child
+
+  """
+  Restores the AVL property at node, whose subtrees are AVL trees whose heights differ by at most 2
+
+  Parameters:
+  - node: The root of the subtree
+
+  Returns:
+  - The new root of the subtree
+
+  Time complexity: O(1)
+  """
+  def _rebalance(self, node):
+    self._updateNode(node)
+    balance = self._height(node.left) - self._height(node.right)
+    if balance > 1:
+      if self._height(node.left.left) < self._height(node.left.right): # Left-right case
+        node.left = self._rotateLeft(node.left)
+      return self._rotateRight(node)
+    if balance < -1:
+      if self._height(node.right.right) < self._height(node.right.left): # Right-left case
+        node.right = self._rotateRight(node.right)
+      return self._rotateLeft(node)
+    return node
+
+  """
+  Walks back up a path after an insertion or deletion below it. The heights of the nodes on the path are updated and,
+  in balanced mode, the nodes are rebalanced and the rotated subtrees are linked to their parent again. Once a subtree
+  has its old height the nodes above it are not affected, so the walk stops there. The sizes on the path have to be
+  updated by the caller before.
+
+  Parameters:
+  - path: The nodes from the top of the changed subtree down to the parent of the changed node
+
+  Returns:
+  - The new top of the path
+
+  Time complexity: O(length of the path)
+  """
+  def _fixPath(self, path):
+    top = None
+    for i in range(len(path) - 1, -1, -1):
+      node = path[i]
+      old_height = node.height
+      if self.balanced:
+        top = self._rebalance(node)
+      else:
+        self._updateNode(node)
+        top = node
+      if i > 0 and top is not node:
+        parent = path[i - 1]
+        if parent.left is node:
+          parent.left = top
+        else:
+          parent.right = top
+      if top.height == old_height:
+        return path[0] if i > 0 else top
+    return top
+
+  """
+  Finds the node with the k-th smallest key. The subtree sizes tell on which side of every node it is.
+
+  Parameters:
+  - k: The position of the key in sorted order, starting at 1
+
+  Returns:
+  - The node with the k-th smallest key, or None when k is not between 1 and the number of keys
+
+  Time complexity: O(n), O(log n) when balanced
+  """
+  def select(self, k):
+    current = self.root
+    while current is not None:
+      leftSize = self._size(current.left)
+      if k <= leftSize:
+        current = current.left
+      elif k == leftSize + 1:
+        return current
+      else:
+        k -= leftSize + 1
+        current = current.right
+    return None
+
+  """
+  Counts the keys smaller than a key, or smaller than or equal to it
+
+  Parameters:
+  - key: The key to compare with, it does not have to be in the tree
+  - inclusive: Also count the key itself
+
+  Returns:
+  - The number of keys
+
+  Time complexity: O(n), O(log n) when balanced
+  """
+  def _countBelow(self, key, inclusive):
+    count = 0
+    current = self.root
+    while current is not None:
+      if key < current.key or (key == current.key and not inclusive):
+        current = current.left
+      else:
+        count += self._size(current.left) + 1
+        if key == current.key:
+          break
+        current = current.right
+    return count
+
+  """
+  Given a key, returns its rank, the number of keys smaller than or equal to it
+
+  Parameters:
+  - key: The key, it does not have to be in the tree
+
+  Returns:
+  - The rank of the key
+
+  Time complexity: O(n), O(log n) when balanced
+  """
+  def rank(self, key):
+    return self._countBelow(key, True)
+
+  """
+  Counts the keys between lo and hi, both included
+
+  Parameters:
+  - lo: The lower bound
+  - hi: The upper bound
+
+  Returns:
+  - The number of keys in the range
+
+  Time complexity: O(n), O(log n) when balanced
+  """
+  def countRange(self, lo, hi):
+    if lo > hi:
+      return 0
+    return self._countBelow(hi, True) - self._countBelow(lo, False)
+
+  """
+  Yields the keys between lo and hi, both included, in sorted order. Subtrees that are completely below lo are skipped
+  and the traversal stops at the first key above hi, so only the path to lo and the keys in the range are visited.
+
+  Parameters:
+  - lo: The lower bound
+  - hi: The upper bound
+
+  Returns:
+  - A generator of the keys in the range
+
+  Time complexity: O(n), O(log n + number of keys in the range) when balanced
+  """
+  def iterRange(self, lo, hi):
+    stack = []
+    current = self.root
+    while True:
+      while current is not None:
+        if current.key < lo:
+          current = current.right
+        else:
+          stack.append(current)
+          current = current.left
+      if not stack: # No keys left at or above lo
+        return
+      current = stack.pop()
+      if current.key > hi:
+        return
+      yield current.key
+      current = current.right
 
   # If node with key k alreay exists in the tree, do nothing
   # Otherwise, insert new node with key k 
   """
   Inserts a node with key k in a tree. If the key already exists then it does nothing. 
-  Otherwise, k is inserted
+  Otherwise, k is inserted. The path from the root is kept so the tree can be rebalanced on the way back up without recursion.
 
   Parameters:
   - k: key to be inserted
 
-  Time complexity: O(n)
+  Time complexity: O(n), O(log n) when balanced
   """
   def insertNode(self, k):
     # Practice 7
     if self.root is None: # O(1)
       self.root = TreeNode(k)
       return
+    path = []
+    current = self.root
+    while current is not None: # O(n) - it depends on the depth of the tree
+      path.append(current)
+      if k < current.key:
+        current = current.left
+      elif k > current.key: # O(1)
+        current = current.right
+      else:
+        return # The key already exists
+    for node in path:
+      node.size += 1
+    if k < path[-1].key:
+      path[-1].left = TreeNode(k)
     else:
-      current = self.root
-      while True: # O(n) - it depends on the depth of the tree
-        if k < current.key:
-          if current.left is None: # O(1)
-            current.left = TreeNode(k)
-            break
-          else:
-            current = current.left
-        elif k > current.key: # O(1)
-          if current.right is None:
-            current.right = TreeNode(k)
-            break
-          else:
-            current = current.right
+      path[-1].right = TreeNode(k)
+    self.root = self._fixPath(path)
       
   # If deletion fails, immediately terminate the program
   # Otherwise, delete the node with key k
   """
-  Deletes a node with key k
+  Deletes a node with key k. A node with two children takes the key of its inorder successor (smallest in the right subtree),
+  and the successor is removed instead. Like insertNode it keeps the path instead of recursing.
+  When node is inside the tree, the path starts at the root so the sizes and heights of its ancestors are updated as well
+  (and rebalanced), and the returned subtree is the one already linked where node was, so assigning it back changes nothing.
 
   Parameters:
   - k: key of the node to be deleted
+  - node: The root of the subtree to delete from. If None or the root, the whole tree
 
-  Time complexity: O(n)
+  Returns:
+  - The new root of the (sub)tree
+
+  Time complexity: O(n), O(log n) when balanced
   """
   def deleteNode(self, k, node=None):
-    if node is None: # Base case O(1)
-        node = self.root
-
-    if node is None: # Base case O(1)
-        return node
+    whole_tree = node is None or node is self.root
+    if whole_tree: # O(1)
+      node = self.root
 
-    if k < node.key: # Recursive case O(n) - depends on height of tree
-        node.left = self.deleteNode(k, node.left)
-    elif k > node.key:
-        node.right = self.deleteNode(k, node.right)
+    # The ancestors of node, when node is a subtree of the tree
+    ancestors = []
+    current = self.root
+    while not whole_tree and node is not None and current is not None and current is not node:
+      ancestors.append(current)
+      current = current.left if node.key < current.key else current.right
+    if current is None: # node is not in the tree, it is handled on its own
+      ancestors = []
+    parent = ancestors[-1] if ancestors else None
+    on_left = parent is not None and parent.left is node
+
+    path = []
+    current = node
+    while current is not None and current.key != k: # O(n) - depends on height of tree
+      path.append(current)
+      current = current.left if k < current.key else current.right
+    if current is None: # The key is not in the tree
+      return node
+    path = ancestors + path
+
+    if current.left is not None and current.right is not None:
+      # Node with two children, get the inorder successor (smallest in the right subtree)
+      path.append(current)
+      successor = current.right
+      while successor.left is not None:
+        path.append(successor)
+        successor = successor.left
+      current.key = successor.key
+      current = successor
+
+    # The node has only one child or no child, which takes its place
+    for pathNode in path:
+      pathNode.size -= 1
+    child = current.left if current.left is not None else current.right
+    if not path:
+      top = child
     else:
-        # Node with only one child or no child
-        if node.left is None:
-            temp = node.right # Set temp ot point to the node to be deleted's right child
-            node = None # Deletion of node
-            return temp # Make the temp take the place of the deleted node
-        elif node.right is None:
-            temp = node.left
-            node = None
-            return temp
-
-        # Node with two children, get the inorder successor (smallest in the right subtree)
-        temp = self.findMin(node.right)
-        node.key = temp.key
-        node.right = self.deleteNode(temp.key, node.right)
-
-    return node
+      if path[-1].left is current:
+        path[-1].left = child
+      else:
+        path[-1].right = child
+      top = self._fixPath(path)
+    if whole_tree or ancestors:
+      self.root = top
+    if ancestors:
+      return parent.left if on_left else parent.right
+    return top
 
 if __name__ == "__main__":
-  if len(sys.argv) != 3:
-    raise Exception("Correct usage: [program] [input] [output]")
+  balanced = len(sys.argv) == 4 and sys.argv[3] == "--balanced"
+  if len(sys.argv) != 3 and not balanced:
+    raise Exception("Correct usage: [program] [input] [output] [--balanced]")
   
-  tree = BinarySearchTree()
+  tree = BinarySearchTree(balanced)
   with open(sys.argv[1], 'r') as inFile:
     lines = inFile.readlines()
   with open(sys.argv[2], 'w') as outFile:
@@ -294,7 +777,7 @@ if __name__ == "__main__":
       op = words[0]
       if op == BUILD:
         data = [int(s) for s in words[1:]]
-        tree.root = tree.arrayToBST(data, 0, len(data) - 1)
+        tree.bulkLoad(data)
         if tree.root:
           outFile.write(BUILD + "\n")
           tree.printTree()
@@ -344,6 +827,30 @@ if __name__ == "__main__":
         k = int(words[1])
         tree.insertNode(k)
         outFile.write(f"I{k}\n")
+      elif op == MERGE:
+        data = [int(s) for s in words[1:]]
+        tree.bulkInsert(data)
+        outFile.write(f"U{len(data)}\n")
+      elif op == SELECT:
+        if len(words) != 2:
+          raise Exception("SELECT: invalid input")
+        found = tree.select(int(words[1]))
+        if not found:
+          raise Exception("SELECT: Failed")
+        else:
+          outFile.write(str(found.key) + "\n")
+      elif op == RANK:
+        if len(words) != 2:
+          raise Exception("RANK: invalid input")
+        outFile.write(str(tree.rank(int(words[1]))) + "\n")
+      elif op == COUNT_RANGE:
+        if len(words) != 3:
+          raise Exception("COUNT_RANGE: invalid input")
+        outFile.write(str(tree.countRange(int(words[1]), int(words[2]))) + "\n")
+      elif op == RANGE:
+        if len(words) != 3:
+          raise Exception("RANGE: invalid input")
+        outFile.write("".join(f"{k} " for k in tree.iterRange(int(words[1]), int(words[2]))) + "\n")
       elif op == DELETE:
         if len(words) != 2:
           raise Exception("DELETE: invalid input")
@@ -7,6 +7,8 @@ FIND_MAX = 'M'
 
 # Node implementation
 class TreeNode:
+  # Fixed attributes instead of a per-node __dict__, which takes most of the memory of a node
+  __slots__ = ("key", "right", "left")
   def __init__(self, key):
     self.key = key
     self.right = None
@@ -45,6 +47,81 @@ class BinarySearchTree:
     node.right = self.arrayToBST(arr, mid+1, r)
     return node
   
+  """
+  Builds a perfectly balanced tree from sorted unique keys without recursion. Every range of the array is split at its middle
+  like in arrayToBST, but the ranges still to be built are kept on an explicit stack.
+
+  Parameters:
+  keys (list[int]): Sorted keys without duplicates
+
+  Returns:
+  The root node of the constructed tree
+
+  Time complexity: O(n)
+  """
+  def _buildBalanced(self, keys):
+    if not keys:
+      return None
+    nodes = [TreeNode(k) for k in keys]
+    stack = [(0, len(keys) - 1)]
+    while stack:
+      l, r = stack.pop()
+      mid = (l + r) // 2
+      node = nodes[mid]
+      if l < mid:
+        node.left = nodes[(l + mid - 1) // 2]
+        stack.append((l, mid - 1))
+      if mid < r:
+        node.right = nodes[(mid + 1 + r) // 2]
+        stack.append((mid + 1, r))
+    return nodes[(len(keys) - 1) // 2]
+
+  """
+  Returns the keys of the tree in sorted order, using an explicit stack instead of recursion
+
+  Time complexity: O(n)
+  """
+  def _inorderKeys(self):
+    keys = []
+    stack = []
+    current = self.root
+    while stack or current is not None:
+      while current is not None:
+        stack.append(current)
+        current = current.left
+      current = stack.pop()
+      keys.append(current.key)
+      current = current.right
+    return keys
+
+  """
+  Replaces the tree by a perfectly balanced tree of the given keys. Unlike arrayToBST the keys do not need to be sorted or unique.
+
+  Parameters:
+  keys (list[int]): The keys, in any order and possibly with duplicates
+
+  Time complexity: O(n log n) for sorting
+  """
+  def bulkLoad(self, keys):
+    self.root = self._buildBalanced(sorted(set(keys)))
+
+  """
+  Adds a batch of keys to the tree. The batch is deduplicated against itself and the tree, sorted, merged with the sorted keys
+  of the tree, and the tree is rebuilt perfectly balanced, which is faster than inserting the keys one by one for large batches.
+
+  Parameters:
+  keys (list[int]): The keys to add, in any order and possibly with duplicates or keys already in the tree
+
+  Time complexity: O(n + m log m) for a tree of n keys and a batch of m keys
+  """
+  def bulkInsert(self, keys):
+    existing = self._inorderKeys()
+    batch = set(keys)
+    batch.difference_update(existing)
+    merged = existing + sorted(batch)
+    merged.sort() # The list consists of two sorted runs, which the sort merges in linear time
+    self.root = self._buildBalanced(merged)
+
   """
   Goes through the trees and looks for the lowest value in the tree
 
@@ -128,7 +205,7 @@ if __name__ == "__main__":
       op = words[0]
       if op == BUILD:
         data = [int(s) for s in words[1:]]
-        tree.root = tree.arrayToBST(data, 0, len(data) - 1)
+        tree.bulkLoad(data)
         if tree.root:
           outFile.write(BUILD + "\n")
           tree.printTree()